@@ -0,0 +1,127 @@
+"""
+Batch degrees queries: many (source, target) pairs at once.
+
+Pairs are grouped by source so a single breadth-first search answers
+every target of that source, and the groups are spread over a process
+pool. Results stream out as JSON lines, in completion order.
+
+    python batch.py PAIRS [directory] [--workers N] [--output FILE]
+
+PAIRS is a CSV file with one "source,target" pair per line; each side
+may be a person id or a name; people sharing a name are settled by
+the name index ranking.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import degrees
+
+
+def read_pairs(path):
+    """ Yields (source, target) pairs from a CSV file, skipping blanks. """
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2:
+                yield row[0].strip(), row[1].strip()
+
+
+def resolve(value):
+    """ Returns (person_id, None) or (None, error message). """
+    person_id = degrees.find_person(value)
+    if person_id is None:
+        return None, "person not found"
+    return person_id, None
+
+
+def group_pairs(pairs):
+    """
+    Resolve PAIRS and group them by source. Returns
+    ({source_id: [(source, target, target_id), ...]}, [error records]).
+    """
+    groups = {}
+    errors = []
+    for source, target in pairs:
+        source_id, error = resolve(source)
+        target_id, target_error = resolve(target)
+        if error or target_error:
+            errors.append({"source": source, "target": target,
+                           "error": error or target_error})
+            continue
+        groups.setdefault(source_id, []).append((source, target, target_id))
+    return groups, errors
+
+
+def answer_group(source_id, queries):
+    """ Answer every query in one group from a single search. """
+    paths = degrees.paths_from(source_id, {target_id for _, _, target_id in queries})
+    results = []
+    for source, target, target_id in queries:
+        path = paths[target_id]
+        results.append({
+            "source": source,
+            "target": target,
+            "source_id": source_id,
+            "target_id": target_id,
+            "degrees": None if path is None else len(path),
+            "path": path
+        })
+    return results
+
+
+def init_worker(directory):
+    # forked workers inherit the parent's data; spawned ones load their own
+    if not degrees.people:
+        degrees.load(directory)
+
+
+def run(pairs, directory, workers=None):
+    """
+    Yields one result record per pair. With WORKERS == 1, or when
+    there is only one group, runs in this process.
+    """
+    groups, errors = group_pairs(pairs)
+    yield from errors
+    if workers == 1 or len(groups) <= 1:
+        for source_id, queries in groups.items():
+            yield from answer_group(source_id, queries)
+        return
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker,
+                             initargs=(directory,)) as executor:
+        futures = [executor.submit(answer_group, source_id, queries)
+                   for source_id, queries in groups.items()]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="batch degrees queries")
+    parser.add_argument("pairs", help="CSV file of source,target pairs")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in run(read_pairs(args.pairs), args.directory, args.workers):
+            out.write(json.dumps(record) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
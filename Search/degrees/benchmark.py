@@ -0,0 +1,369 @@
+"""
+Microbenchmarks for the degrees search code.
+
+Usage: python benchmark.py frontier [max_size]
+       python benchmark.py landmarks directory [queries]
+       python benchmark.py loader directory
+       python benchmark.py bfs directory [queries]
+       python benchmark.py suite [--sizes 10000,100000] [--queries N]
+                                 [--memory] [--output FILE]
+"""
+
+import argparse
+import csv
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import degrees
+import landmarks
+import snapshot
+import synthetic
+from graph import Graph
+from util import Node, StackFrontier, QueueFrontier
+
+
+def bench_frontier(frontier_class, size, pops=10000):
+    """
+    Fill a frontier with SIZE nodes, then time POPS remove() calls.
+    Returns the average cost of one remove() in nanoseconds.
+    """
+    frontier = frontier_class()
+    for i in range(size):
+        frontier.add(Node(i, None, None))
+    pops = min(pops, size)
+    start = time.perf_counter_ns()
+    for _ in range(pops):
+        frontier.remove()
+    return (time.perf_counter_ns() - start) / pops
+
+
+def frontier_sizes(max_size):
+    """ 1000, 10000, ... up to MAX_SIZE """
+    size = 1000
+    while size <= max_size:
+        yield size
+        size *= 10
+
+
+def bench_landmarks(queries, index, seed=0):
+    """
+    Run QUERIES random connected-or-not pairs through uninformed search
+    and landmark A*. Returns total (bfs_expanded, astar_expanded).
+    """
+    rng = random.Random(seed)
+    person_ids = list(degrees.people)
+    totals = [0, 0]
+    for _ in range(queries):
+        source, target = rng.choice(person_ids), rng.choice(person_ids)
+        for i, heuristic in enumerate((None, index)):
+            stats = {}
+            landmarks.shortest_path(source, target, heuristic, stats)
+            totals[i] += stats["expanded"]
+    return totals
+
+
+def legacy_load_data(directory):
+    """
+    The original csv.DictReader loader, kept only as a baseline.
+    Returns (names, people, movies).
+    """
+    names, people, movies = {}, {}, {}
+    with open(f"{directory}/people.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            people[row["id"]] = {
+                "name": row["name"],
+                "birth": row["birth"],
+                "movies": set()
+            }
+            if row["name"].lower() not in names:
+                names[row["name"].lower()] = {row["id"]}
+            else:
+                names[row["name"].lower()].add(row["id"])
+    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            movies[row["id"]] = {
+                "title": row["title"],
+                "year": row["year"],
+                "stars": set()
+            }
+    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                people[row["person_id"]]["movies"].add(row["movie_id"])
+                movies[row["movie_id"]]["stars"].add(row["person_id"])
+            except KeyError:
+                pass
+    return names, people, movies
+
+
+def bench_loader(directory):
+    """
+    Time the legacy loader against fill_data, which parses the same
+    files into the same dicts, and the whole of load_data, which also
+    labels components. Returns {step: seconds} and checks that the
+    loaders agree.
+    """
+    timings = {}
+    start = time.perf_counter()
+    expected = legacy_load_data(directory)
+    timings["dictreader"] = time.perf_counter() - start
+
+    for table in (degrees.names, degrees.people, degrees.movies):
+        table.clear()
+    # with the cycle collector paused, as load_data runs it
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        degrees.fill_data(directory)
+        timings["streaming"] = time.perf_counter() - start
+    finally:
+        gc.enable()
+    if (degrees.names, degrees.people, degrees.movies) != expected:
+        raise AssertionError("streaming loader disagrees with the legacy loader")
+
+    start = time.perf_counter()
+    degrees.load_data(directory)
+    timings["load_data"] = time.perf_counter() - start
+    start = time.perf_counter()
+    degrees.label_components()
+    timings["components"] = time.perf_counter() - start
+    return timings
+
+
+def legacy_shortest_path(source, target):
+    """
+    The original Node-chain BFS, kept only as a baseline: goal test on
+    removal, and people re-enqueued until they are first removed.
+    """
+    visited_state = set()
+    frontier = QueueFrontier()
+    frontier.add(Node(source, None, None))
+    while True:
+        if frontier.empty():
+            return None
+        curr_node = frontier.remove()
+        visited_state.add(curr_node.state)
+        if curr_node.state == target:
+            path = []
+            while curr_node.parent is not None:
+                path.append((curr_node.action, curr_node.state))
+                curr_node = curr_node.parent
+            return path[::-1]
+        for m, p in degrees.neighbors_for_person(curr_node.state):
+            if p not in visited_state:
+                frontier.add(Node(p, curr_node, m))
+
+
+def allocation_peak(func, *args):
+    """ Returns (peak bytes traced while running FUNC, its result). """
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def bench_bfs(pairs):
+    """
+    Compare legacy_shortest_path with degrees.shortest_path on PAIRS.
+    Returns {name: {"seconds", "peak_bytes"}}, checking the paths are
+    equally long; ties between shortest paths may break differently.
+    """
+    results = {}
+    paths = {}
+    for name, search in (("legacy", legacy_shortest_path),
+                         ("lean", degrees.shortest_path)):
+        seconds, found = timed(lambda: [search(s, t) for s, t in pairs])
+        peak = max(allocation_peak(search, s, t)[0] for s, t in pairs)
+        results[name] = {"seconds": seconds, "peak_bytes": peak}
+        paths[name] = found
+    lengths = {name: [None if path is None else len(path) for path in found]
+               for name, found in paths.items()}
+    if lengths["legacy"] != lengths["lean"]:
+        raise AssertionError("lean BFS paths differ in length from the legacy BFS")
+    return results
+
+
+def timed(func, *args, **kwargs):
+    """ Returns (seconds, result) for one call. """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def latency_summary(seconds):
+    """ mean/p50/p95/max in milliseconds for a list of durations """
+    ms = sorted(1000 * s for s in seconds)
+    return {
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": ms[len(ms) // 2],
+        "p95_ms": ms[int(0.95 * (len(ms) - 1))],
+        "max_ms": ms[-1]
+    }
+
+
+def random_pairs(person_ids, count, seed=0):
+    """ COUNT pairs drawn from the largest component, so queries do work """
+    rng = random.Random(seed)
+    roots = {}
+    for person_id in person_ids:
+        root = degrees.components.find(person_id)
+        roots.setdefault(root, []).append(person_id)
+    giant = max(roots.values(), key=len)
+    return [(rng.choice(giant), rng.choice(giant)) for _ in range(count)]
+
+
+def bench_suite(directory, queries=100, memory=False):
+    """
+    Time loading, single queries and a batch query over DIRECTORY.
+    Returns a flat dict of results.
+    """
+    results = {}
+    results["load_data_s"], _ = timed(degrees.load_data, directory)
+    results["people"] = len(degrees.people)
+    results["movies"] = len(degrees.movies)
+    results["credits"] = sum(len(m["stars"]) for m in degrees.movies.values())
+    pairs = random_pairs(list(degrees.people), queries)
+
+    durations = [timed(degrees.shortest_path_bidirectional, s, t)[0] for s, t in pairs]
+    results["bidirectional"] = latency_summary(durations)
+    # skewed traffic: every query comes from one of three hot sources
+    hot = [(pairs[i % 3][0], t) for i, (_, t) in enumerate(pairs)]
+    durations = [timed(degrees.cached_path, s, t)[0] for s, t in hot]
+    results["cached_path_hot"] = latency_summary(durations)
+    source = pairs[0][0]
+    targets = [t for _, t in pairs]
+    results["batch_paths_from_s"], _ = timed(degrees.paths_from, source, targets)
+
+    results["load_graph_s"], g = timed(Graph.load, directory)
+    durations = [timed(g.shortest_path, s, t)[0] for s, t in pairs]
+    results["graph_shortest_path"] = latency_summary(durations)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, snapshot.FILENAME)
+        results["snapshot_build_s"], _ = timed(snapshot.build, directory, path)
+        results["snapshot_load_s"], _ = timed(snapshot.load, directory, path)
+
+    if memory:
+        # tracemalloc slows allocation down, so measure in a separate pass
+        tracemalloc.start()
+        degrees.load_data(directory)
+        results["load_data_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def suite_main(args):
+    parser = argparse.ArgumentParser(prog="benchmark.py suite",
+                                     description="synthetic degrees benchmark suite")
+    parser.add_argument("--sizes", default="10000,100000",
+                        help="comma-separated people counts to generate")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true",
+                        help="also measure peak load memory with tracemalloc")
+    parser.add_argument("--output", help="append JSON lines here (default: stdout)")
+    args = parser.parse_args(args)
+
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            with tempfile.TemporaryDirectory() as directory:
+                generate_s, _ = timed(synthetic.generate, directory, size, args.seed)
+                record = {
+                    "revision": git_revision(),
+                    "python": platform.python_version(),
+                    "size": size,
+                    "seed": args.seed,
+                    "queries": args.queries,
+                    "generate_s": generate_s
+                }
+                record.update(bench_suite(directory, args.queries, args.memory))
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def frontier_main(args):
+    max_size = int(args[0]) if args else 1000000
+    print(f"{'size':>10} {'stack ns/pop':>14} {'queue ns/pop':>14}")
+    for size in frontier_sizes(max_size):
+        stack = bench_frontier(StackFrontier, size)
+        queue = bench_frontier(QueueFrontier, size)
+        print(f"{size:>10} {stack:>14.1f} {queue:>14.1f}")
+
+
+def landmarks_main(args):
+    directory = args[0]
+    queries = int(args[1]) if len(args) == 2 else 100
+    degrees.load_data(directory)
+    start = time.perf_counter()
+    index = landmarks.LandmarkIndex.build()
+    print(f"built {len(index.landmarks)} landmarks in "
+          f"{time.perf_counter() - start:.2f}s")
+    bfs, astar = bench_landmarks(queries, index)
+    print(f"{queries} queries: {bfs} people expanded by BFS, "
+          f"{astar} by landmark A* ({astar / max(bfs, 1):.1%})")
+
+
+def bfs_main(args):
+    directory = args[0]
+    queries = int(args[1]) if len(args) == 2 else 20
+    degrees.load_data(directory)
+    results = bench_bfs(random_pairs(list(degrees.people), queries))
+    for name, result in results.items():
+        print(f"{name:>8}: {result['seconds']:.3f}s, "
+              f"peak {result['peak_bytes'] / 2**20:.1f} MiB per query")
+
+
+def loader_main(args):
+    timings = bench_loader(args[0])
+    for label in ("dictreader", "streaming"):
+        print(f"{label:>12}: {timings[label]:.3f}s "
+              f"({timings['dictreader'] / timings[label]:.2f}x legacy)")
+    print(f"{'load_data':>12}: {timings['load_data']:.3f}s "
+          f"(components {timings['components']:.3f}s)")
+
+
+COMMANDS = {
+    "frontier": (frontier_main, 0, 1),
+    "landmarks": (landmarks_main, 1, 2),
+    "loader": (loader_main, 1, 1),
+    "bfs": (bfs_main, 1, 2),
+    "suite": (suite_main, 0, None),
+}
+
+
+def main():
+    command = COMMANDS.get(sys.argv[1]) if len(sys.argv) > 1 else None
+    if command is None or len(sys.argv) - 2 < command[1] or (
+            command[2] is not None and len(sys.argv) - 2 > command[2]):
+        sys.exit(__doc__.strip())
+    command[0](sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
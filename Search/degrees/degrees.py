@@ -1,7 +1,13 @@
-import csv
+import gc
+import heapq
 import sys
+import threading
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+from graph import Graph
+from lookup import NameIndex
+from util import CSV_COLUMNS, DisjointSet, LRUCache, read_rows
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,57 +18,219 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Groups person_ids into connected components; rebuilt by load_data,
+# and set to None when an update may have split a component
+components = DisjointSet()
 
-def load_data(directory):
+# Full BFS trees of recent sources, keyed by person_id; emptied on reload
+TREE_CACHE_TREES = 32
+TREE_CACHE_BYTES = 512 * 1024 * 1024
+tree_cache = LRUCache(TREE_CACHE_TREES, TREE_CACHE_BYTES,
+                      lambda tree: tree_weight(tree))
+
+# A full tree costs far more than one bidirectional search, so a source
+# only gets one on its TREE_CACHE_AFTER-th miss; misses are counted for
+# the TREE_MISS_WINDOW most recent cold sources
+TREE_CACHE_AFTER = 2
+TREE_MISS_WINDOW = 4096
+tree_cache_after = TREE_CACHE_AFTER
+tree_misses = LRUCache(TREE_MISS_WINDOW)
+
+# Optional precomputed neighbors_for_person results, set by build_adjacency
+adjacency = None
+
+# Name lookup index for prefix and fuzzy queries. Exact lookups go through
+# names, so the index is only built by get_name_index, on first use, or
+# mapped in with a snapshot; updates reset it
+name_index = None
+name_index_lock = threading.Lock()
+
+# Compact CSR copy of the data, set by load_graph; None when using the dicts
+graph = None
+
+
+def load_data(directory, progress=None):
     """
     Load data from CSV files into memory.
+
+    Rows are streamed as tuples in chunks. If PROGRESS is given it is
+    called as progress(filename, rows_so_far, rows_per_second) after
+    each chunk.
     """
+    global graph, names, people, movies
+    if graph is not None:
+        # drop the read-only views left behind by load_graph
+        graph = None
+        names, people, movies = {}, {}, {}
+    else:
+        # reloading replaces, rather than merges into, earlier data
+        names.clear()
+        people.clear()
+        movies.clear()
+    invalidate_indexes()
+
+    # Everything loaded is long-lived, so pause the cycle collector
+    # rather than let it rescan the growing dicts on every allocation burst
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        fill_data(directory, progress)
+    finally:
+        if collecting:
+            gc.enable()
+
+    label_components()
+
+
+def fill_data(directory, progress=None):
+    """ Stream DIRECTORY's CSV rows into names, people and movies. """
+    people_rows, movie_rows, star_rows = [
+        read_rows(directory, name, columns, progress)
+        for name, columns in CSV_COLUMNS]
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
+    for chunk in people_rows:
+        for person_id, name, birth in chunk:
+            people[person_id] = {
+                "name": name,
+                "birth": birth,
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
+            key = name.lower()
+            person_ids = names.get(key)
+            if person_ids is None:
+                names[key] = {person_id}
             else:
-                names[row["name"].lower()].add(row["id"])
+                person_ids.add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
+    for chunk in movie_rows:
+        for movie_id, title, year in chunk:
+            movies[movie_id] = {
+                "title": title,
+                "year": year,
                 "stars": set()
             }
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+    for chunk in star_rows:
+        for person_id, movie_id in chunk:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
             except KeyError:
                 pass
 
 
+def print_progress(filename, rows, rate):
+    """ a load_data progress callback that reports to stderr """
+    print(f"  {filename}: {rows} rows ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+def label_components():
+    """
+    Rebuild the components union-find from people and movies:
+    everyone who starred in the same movie is in the same component.
+    """
+    global components
+    components = DisjointSet.from_groups(
+        people, (movie["stars"] for movie in movies.values()))
+
+
+def same_component(source, target):
+    """
+    Returns False when SOURCE and TARGET are known to be in different
+    components, so no path can exist; True otherwise.
+    """
+    if graph is not None:
+        return graph.same_component(source, target)
+    if components is None:
+        label_components()
+    if source not in components or target not in components:
+        return True
+    return components.find(source) == components.find(target)
+
+
+def component_stats():
+    """ Component counts and sizes, for diagnostics. """
+    if graph is not None:
+        sizes = graph.component_sizes().values()
+    else:
+        if components is None:
+            label_components()
+        sizes = components.sizes().values()
+    sizes = sorted(sizes, reverse=True)
+    return {
+        "components": len(sizes),
+        "people": sum(sizes),
+        "largest": sizes[0] if sizes else 0,
+        "isolated": sizes.count(1),
+        "top_sizes": sizes[:10]
+    }
+
+
+def load_graph(directory):
+    """
+    Load data from CSV files into a compact Graph, and point
+    names, people and movies at read-only views of it.
+    """
+    use_graph(Graph.load(directory))
+
+
+def use_graph(g):
+    """ Answer queries from graph G instead of the load_data dicts. """
+    global graph, names, people, movies, name_index
+    graph = g
+    invalidate_indexes()
+    names = graph.names_view()
+    people = graph.people_view()
+    movies = graph.movies_view()
+    # a snapshot maps its index in; otherwise it is built on first use
+    name_index = graph.name_index
+
+
+def load(directory, compact=False, progress=None):
+    """
+    Load DIRECTORY the fastest available way: an up-to-date snapshot
+    if there is one, else the compact Graph or the plain dicts.
+    """
+    g = snapshot.load(directory)
+    if g is not None:
+        use_graph(g)
+    elif compact:
+        load_graph(directory)
+    else:
+        load_data(directory, progress=progress)
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    known = {"--compact", "--build-index", "--components", "--progress"}
+    if len(args) > 1 or not flags <= known:
+        sys.exit("Usage: python degrees.py [--compact | --build-index | "
+                 "--components] [--progress] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
     # by default choose "large"
 
+    if "--build-index" in flags:
+        print("Building snapshot...")
+        snapshot.build(directory)
+        print(f"Snapshot written to {snapshot.snapshot_path(directory)}.")
+        return
+
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load(directory, compact="--compact" in flags,
+         progress=print_progress if "--progress" in flags else None)
     print("Data loaded.")
 
+    if "--components" in flags:
+        for key, value in component_stats().items():
+            print(f"{key}: {value}")
+        return
+
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
@@ -70,7 +238,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path_bidirectional(source, target)
 
     if path is None:
         print("Not connected.")
@@ -95,46 +263,425 @@ def shortest_path(source, target):
     source: the id of the source person
     target: the id of the target person
     """
-    visited_state = set()
-    frontier = QueueFrontier()
-    # Search problems - people is the state, movie is the action
-    # initial state added to frontier
-    initial_state = source
-    frontier.add(Node(initial_state, None, None))
-    # person_id as state
-    while True:
-        # pick one out
-        if not frontier.empty():
-            curr_node = frontier.remove()
-            visited_state.add(curr_node.state)
+    if graph is not None:
+        return graph.shortest_path(source, target)
+    if source not in people or target not in people:
+        return None
+    if not same_component(source, target):
+        return None
+    # person_id -> (movie_id, parent person_id); also the visited set,
+    # so a person is enqueued at most once
+    parents = {source: None}
+    if source == target:
+        return []
+    # a movie's cast is enqueued once, by its first star reached, so no
+    # (movie_id, person_id) pairs are built per expansion
+    seen_movies = set()
+    frontier = deque([source])
+    while frontier:
+        person_id = frontier.popleft()
+        for m in people[person_id]["movies"]:
+            if m in seen_movies:
+                continue
+            seen_movies.add(m)
+            for p in movies[m]["stars"]:
+                if p in parents:
+                    continue
+                parents[p] = (m, person_id)
+                # goal test on generation: the first time the target is
+                # reached is already along a shortest path
+                if p == target:
+                    return path_from_tree(parents, target)
+                frontier.append(p)
+    return None
+
+
+def shortest_path_bidirectional(source, target):
+    """
+    Same contract as shortest_path, but grows one BFS frontier from
+    the source and another from the target until they meet.
+
+    Each round expands one whole layer of the smaller frontier, so the
+    first layer that touches the other side yields a shortest path.
+    """
+    if graph is not None:
+        # the CSR search is already movie-level with early goal tests
+        return graph.shortest_path(source, target)
+    if source not in people or target not in people:
+        return None
+    if source == target:
+        return []
+    if not same_component(source, target):
+        return None
+    # person_id -> (movie_id, person_id one step closer to that side's root)
+    forward = {source: None}
+    backward = {target: None}
+    # movies each side has already expanded
+    forward_movies, backward_movies = set(), set()
+    forward_layer, backward_layer = [source], [target]
+
+    while forward_layer and backward_layer:
+        if len(forward_layer) <= len(backward_layer):
+            forward_layer, meet = expand_layer(
+                forward_layer, forward, forward_movies, backward)
         else:
-            # if the frontier is empty, fail to find a path
-            return None
-        if is_terminal_state(curr_node.state, target): # test terminates
-            # if is goal, terminates
-            # use Node's attr to backtrack
-            return backtrack_path(curr_node)
+            backward_layer, meet = expand_layer(
+                backward_layer, backward, backward_movies, forward)
+        if meet is not None:
+            return join_paths(meet, forward, backward)
+    return None
+
+
+def expand_layer(layer, parents, seen_movies, other_parents):
+    """
+    Expand every person in LAYER, recording new people in PARENTS.
+    Movies in SEEN_MOVIES are skipped: their whole cast was recorded
+    the first time. Returns the next layer and a person already seen
+    by the other side, or None if the two searches have not met yet.
+    """
+    next_layer = []
+    for person_id in layer:
+        for m in people[person_id]["movies"]:
+            if m in seen_movies:
+                continue
+            seen_movies.add(m)
+            for p in movies[m]["stars"]:
+                if p in parents:
+                    continue
+                parents[p] = (m, person_id)
+                if p in other_parents:
+                    return next_layer, p
+                next_layer.append(p)
+    return next_layer, None
+
+
+def join_paths(meet, forward, backward):
+    """ build the (movie_id, person_id) path through the meeting person """
+    path = []
+    person_id = meet
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent
+    path.reverse()
+    person_id = meet
+    while backward[person_id] is not None:
+        movie_id, child = backward[person_id]
+        path.append((movie_id, child))
+        person_id = child
+    return path
+
+
+def bfs_tree(source, targets=None):
+    """
+    Breadth-first search from SOURCE, returning a dict that maps every
+    reached person_id to (movie_id, parent person_id), with SOURCE
+    mapped to None. When TARGETS is given, the search stops as soon as
+    all of them have been reached.
+    """
+    tree = {source: None}
+    remaining = None if targets is None else set(targets) - {source}
+    if remaining is not None and not remaining:
+        return tree
+    seen_movies = set()
+    layer = [source]
+    while layer:
+        next_layer = []
+        for person_id in layer:
+            for m in people[person_id]["movies"]:
+                # a movie's cast is enqueued once, by its first star reached
+                if m in seen_movies:
+                    continue
+                seen_movies.add(m)
+                for p in movies[m]["stars"]:
+                    if p in tree:
+                        continue
+                    tree[p] = (m, person_id)
+                    if remaining is not None and p in remaining:
+                        remaining.discard(p)
+                        if not remaining:
+                            return tree
+                    next_layer.append(p)
+        layer = next_layer
+    return tree
+
+
+def path_from_tree(tree, target):
+    """ the (movie_id, person_id) path to TARGET in a bfs_tree, or None """
+    if target not in tree:
+        return None
+    path = []
+    while tree[target] is not None:
+        movie_id, parent = tree[target]
+        path.append((movie_id, target))
+        target = parent
+    return path[::-1]
+
+
+def paths_from(source, targets):
+    """
+    Returns {target: path or None} for every person_id in TARGETS,
+    sharing one breadth-first search from SOURCE.
+    """
+    if graph is not None:
+        return graph.paths_from(source, targets)
+    if source not in people:
+        return {target: None for target in targets}
+    # only wait for targets that can actually be reached
+    tree = bfs_tree(source, [t for t in targets
+                             if t in people and same_component(source, t)])
+    return {target: path_from_tree(tree, target) for target in targets}
+
+
+def tree_weight(tree):
+    """ rough bytes held by a cached tree, for the cache's memory bound """
+    if isinstance(tree, dict):
+        # dict slot plus a (movie_id, person_id) tuple per person
+        return sys.getsizeof(tree) + 64 * len(tree)
+    _, parent_person, parent_movie = tree
+    return (parent_person.itemsize * len(parent_person)
+            + parent_movie.itemsize * len(parent_movie))
+
+
+def configure_tree_cache(max_trees=TREE_CACHE_TREES, max_bytes=TREE_CACHE_BYTES,
+                         after=TREE_CACHE_AFTER):
+    """
+    Replace tree_cache with an empty cache holding at most these, that
+    builds a source's tree on its AFTER-th miss.
+    """
+    global tree_cache, tree_cache_after
+    tree_cache = LRUCache(max_trees, max_bytes, tree_weight)
+    tree_cache_after = after
+    tree_misses.clear()
+
+
+def cached_path(source, target):
+    """
+    Same contract as shortest_path, but answers hot sources from a
+    cached BFS tree of SOURCE. A miss is answered by the bidirectional
+    search, until the source has missed tree_cache_after times: then
+    its full tree is built and cached.
+    """
+    if source not in people or target not in people:
+        return None
+    if not same_component(source, target):
+        return None
+    tree = tree_cache.get(source)
+    if tree is None:
+        misses = tree_misses.get(source, 0) + 1
+        if misses < tree_cache_after:
+            tree_misses.put(source, misses)
+            return shortest_path_bidirectional(source, target)
+        tree_misses.discard(source)
+        if graph is not None:
+            s = graph.person_index(source)
+            tree = (s, *graph.search(s))
         else:
-            # else, expand the frontier by adding the neighbor
-            for m, p in neighbors_for_person(curr_node.state):
-                if p not in visited_state:
-                    # avoid adding visited state
-                    frontier.add(Node(p, curr_node, m))
+            tree = bfs_tree(source)
+        tree_cache.put(source, tree)
+    if graph is not None:
+        s, parent_person, parent_movie = tree
+        t = graph.person_index(target)
+        if parent_person[t] == -1:
+            return None
+        return graph.backtrack(s, t, parent_person, parent_movie)
+    return path_from_tree(tree, target)
 
 
-def backtrack_path(target_node):
-    """ return a list from source_node to target_node """
-    curr_node = target_node
+def all_shortest_paths(source, target):
+    """
+    Lazily yields every shortest (movie_id, person_id) path from SOURCE
+    to TARGET. One BFS layers the graph up to TARGET's depth, keeping
+    every predecessor one layer closer; paths are then read back from
+    TARGET on demand, so stopping early costs nothing more.
+    """
+    if source not in people or target not in people:
+        return
+    if source == target:
+        yield []
+        return
+    if not same_component(source, target):
+        return
+    depth = {source: 0}
+    # person_id -> [(movie_id, parent person_id)] one layer closer to source
+    predecessors = {source: []}
+    # movie_id -> depth of the layer that first expanded it; a movie is
+    # skipped by later layers, whose stars it cannot reach any sooner,
+    # but every star of the same layer must still record it
+    movie_layer = {}
+    layer = [source]
+    while layer and target not in depth:
+        next_layer = []
+        for person_id in layer:
+            d = depth[person_id] + 1
+            for m in people[person_id]["movies"]:
+                if movie_layer.setdefault(m, d) < d:
+                    continue
+                for p in movies[m]["stars"]:
+                    if p not in depth:
+                        depth[p] = d
+                        predecessors[p] = []
+                        next_layer.append(p)
+                    if depth[p] == d:
+                        predecessors[p].append((m, person_id))
+        layer = next_layer
+    if target not in depth:
+        return
+
+    # depth-first walk back from the target; suffix is built in reverse
+    stack = [(target, [])]
+    while stack:
+        person_id, suffix = stack.pop()
+        if person_id == source:
+            yield suffix[::-1]
+            continue
+        for m, parent in reversed(predecessors[person_id]):
+            stack.append((parent, suffix + [(m, person_id)]))
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Lazily yields up to K (all, if K is None) simple paths from SOURCE
+    to TARGET in order of length, shortest first. No person or movie
+    repeats within a path.
+
+    One BFS from TARGET gives exact distances to it; they serve as a
+    perfect heuristic for a best-first enumeration of partial paths,
+    so every yielded path is final and the caller can stop at any time.
+    """
+    if k is not None and k <= 0:
+        return
+    if source not in people or target not in people:
+        return
+    if source == target:
+        yield []
+        return
+    if not same_component(source, target):
+        return
+    to_target = bfs_depths(target)
+    if source not in to_target:
+        return
+
+    # partial paths are linked tuples: (movie_id, person_id, previous)
+    counter = 0
+    frontier = [(to_target[source], counter, source, None)]
+    found = 0
+    while frontier:
+        _, _, person_id, partial = heapq.heappop(frontier)
+        if person_id == target:
+            yield unlink_path(partial)
+            found += 1
+            if found == k:
+                return
+            continue
+        used_people, used_movies = {source}, set()
+        link = partial
+        while link is not None:
+            used_movies.add(link[0])
+            used_people.add(link[1])
+            link = link[2]
+        length = len(used_movies)
+        for m in people[person_id]["movies"]:
+            if m in used_movies:
+                continue
+            for p in movies[m]["stars"]:
+                if p in used_people:
+                    continue
+                counter += 1
+                heapq.heappush(frontier, (length + 1 + to_target[p], counter,
+                                          p, (m, p, partial)))
+
+
+def bfs_depths(source):
+    """ Returns {person_id: hops from SOURCE} for everyone reachable. """
+    depth = {source: 0}
+    seen_movies = set()
+    layer = [source]
+    while layer:
+        next_layer = []
+        for person_id in layer:
+            d = depth[person_id] + 1
+            for m in people[person_id]["movies"]:
+                if m in seen_movies:
+                    continue
+                seen_movies.add(m)
+                for p in movies[m]["stars"]:
+                    if p not in depth:
+                        depth[p] = d
+                        next_layer.append(p)
+        layer = next_layer
+    return depth
+
+
+def unlink_path(link):
+    """ turn a (movie_id, person_id, previous) chain into a path list """
     path = []
-    while curr_node.parent is not None: # ignore the initial state
-        path.append((curr_node.action, curr_node.state))
-        curr_node = curr_node.parent
+    while link is not None:
+        path.append((link[0], link[1]))
+        link = link[2]
     return path[::-1]
 
 
-def is_terminal_state(state, target):
-    """ check if the terminal state is reached"""
-    return state == target
+def resolve_person(value):
+    """
+    Returns the candidate person_ids for VALUE, which may be a
+    person_id or a name, best-ranked first. Never prompts, unlike
+    person_id_for_name.
+    """
+    if value in people:
+        return [value]
+    return rank_people(names.get(" ".join(value.lower().split()), ()))
+
+
+def find_person(value, birth=None, fuzzy=False):
+    """
+    Returns the single best person_id for VALUE (an id or a name), or
+    None. Shared names are settled by BIRTH year if given, then most
+    movies. With FUZZY, near-miss spellings are accepted too.
+    """
+    if value in people:
+        return value
+    person_ids = names.get(" ".join(value.lower().split()))
+    if person_ids:
+        return rank_people(person_ids, birth)[0]
+    if not fuzzy:
+        return None
+    return get_name_index().best(value, birth=birth, fuzzy=True)
+
+
+def rank_people(person_ids, birth=None):
+    """
+    PERSON_IDS best first, as the name index ranks people sharing a
+    name: born in BIRTH if given, then most movies, then by id.
+    """
+    def key(person_id):
+        if graph is not None:
+            p = graph.person_index(person_id)
+            born, count = graph.person_births[p], graph.movie_count(p)
+        else:
+            person = people[person_id]
+            born, count = person["birth"], len(person["movies"])
+        return (born != birth if birth else False, -count, person_id)
+    return sorted(person_ids, key=key)
+
+
+def build_name_index():
+    """ (Re)build the NameIndex over the loaded people. """
+    global name_index
+    if graph is not None:
+        name_index = graph.name_index or NameIndex.from_graph(graph)
+    else:
+        name_index = NameIndex.from_people(people)
+
+
+def get_name_index():
+    """ The NameIndex over people, rebuilt once if an update reset it. """
+    if name_index is None:
+        # one thread builds it; the others wait rather than build their own
+        with name_index_lock:
+            if name_index is None:
+                build_name_index()
+    return name_index
 
 
 def person_id_for_name(name):
@@ -168,6 +715,10 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
+    if adjacency is not None:
+        return adjacency[person_id]
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -176,5 +727,32 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def build_adjacency():
+    """
+    Precompute neighbors_for_person for everyone, so that repeated
+    expansions (A*, landmark builds) stop re-enumerating large casts.
+    Costs one frozenset of pairs per person; dropped on reload.
+    """
+    global adjacency
+    adjacency = None
+    table = {person_id: frozenset(neighbors_for_person(person_id))
+             for person_id in people}
+    adjacency = table
+
+
+def invalidate_indexes():
+    """ Forget every cache and index derived from the loaded data. """
+    global name_index
+    tree_cache.clear()
+    tree_misses.clear()
+    drop_adjacency()
+    name_index = None
+
+
+def drop_adjacency():
+    global adjacency
+    adjacency = None
+
+
 if __name__ == "__main__":
     main()
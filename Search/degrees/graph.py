@@ -0,0 +1,421 @@
+"""
+Compact, integer-indexed storage for the degrees star graph.
+
+People and movies are interned to dense ints in CSV order, and the
+bipartite star graph is kept as two CSR (compressed sparse row)
+adjacency lists:
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]  movies of p
+    movie_stars[movie_offsets[m]:movie_offsets[m + 1]]      stars of m
+
+All integer tables are flat `array`s, so the whole graph costs a few
+bytes per edge instead of a Python set entry per edge.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Mapping
+
+from util import CSV_COLUMNS, read_rows
+
+# 32-bit signed ints: enough for every IMDb id count and half the size of 'q'
+INDEX_TYPE = "i"
+
+
+class Graph():
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 name_order, person_id_order, movie_id_order, components):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        # person ints sorted by lowercased name, for bisect lookups
+        self.name_order = name_order
+        # person and movie ints sorted by id string, for bisect lookups
+        self.person_id_order = person_id_order
+        self.movie_id_order = movie_id_order
+        # person int -> component label (a person int in that component)
+        self.components = components
+        # optional id -> int dicts; faster than bisect when already built
+        self._person_index = None
+        self._movie_index = None
+        # lookup.NameIndex over these people, when a snapshot stored one
+        self.name_index = None
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Build a graph straight from DIRECTORY's CSV files, without
+        going through the people/movies dicts.
+        """
+        columns = dict(CSV_COLUMNS)
+        person_ids, person_names, person_births = [], [], []
+        for chunk in read_rows(directory, "people.csv", columns["people.csv"]):
+            for person_id, name, birth in chunk:
+                person_ids.append(person_id)
+                person_names.append(name)
+                person_births.append(birth)
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        for chunk in read_rows(directory, "movies.csv", columns["movies.csv"]):
+            for movie_id, title, year in chunk:
+                movie_ids.append(movie_id)
+                movie_titles.append(title)
+                movie_years.append(year)
+
+        person_index = {p: i for i, p in enumerate(person_ids)}
+        movie_index = {m: i for i, m in enumerate(movie_ids)}
+        edge_people, edge_movies = array(INDEX_TYPE), array(INDEX_TYPE)
+        seen = set()
+        for chunk in read_rows(directory, "stars.csv", columns["stars.csv"]):
+            for person_id, movie_id in chunk:
+                p = person_index.get(person_id)
+                m = movie_index.get(movie_id)
+                # same rule as load_data: skip unknown ids and duplicates
+                if p is None or m is None or (p, m) in seen:
+                    continue
+                seen.add((p, m))
+                edge_people.append(p)
+                edge_movies.append(m)
+        del seen
+
+        graph = cls._from_edges(person_ids, person_names, person_births,
+                                movie_ids, movie_titles, movie_years,
+                                edge_people, edge_movies)
+        graph._person_index = person_index
+        graph._movie_index = movie_index
+        return graph
+
+    @classmethod
+    def from_data(cls, people, movies):
+        """ Build a graph from load_data's people and movies dicts. """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        movie_index = {m: i for i, m in enumerate(movie_ids)}
+        edge_people, edge_movies = array(INDEX_TYPE), array(INDEX_TYPE)
+        for p, person_id in enumerate(person_ids):
+            for movie_id in people[person_id]["movies"]:
+                edge_people.append(p)
+                edge_movies.append(movie_index[movie_id])
+        return cls._from_edges(
+            person_ids,
+            [people[p]["name"] for p in person_ids],
+            [people[p]["birth"] for p in person_ids],
+            movie_ids,
+            [movies[m]["title"] for m in movie_ids],
+            [movies[m]["year"] for m in movie_ids],
+            edge_people, edge_movies)
+
+    @classmethod
+    def _from_edges(cls, person_ids, person_names, person_births,
+                    movie_ids, movie_titles, movie_years,
+                    edge_people, edge_movies):
+        person_offsets, person_movies = csr(len(person_ids), edge_people, edge_movies)
+        movie_offsets, movie_stars = csr(len(movie_ids), edge_movies, edge_people)
+        lowered = [name.lower() for name in person_names]
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_stars,
+                   sorted_order(lowered), sorted_order(person_ids),
+                   sorted_order(movie_ids),
+                   label_components(len(person_ids), movie_offsets, movie_stars))
+
+    def person_index(self, person_id):
+        """ Returns the dense int for PERSON_ID, or None if unknown. """
+        if self._person_index is not None:
+            return self._person_index.get(person_id)
+        return find_sorted(self.person_id_order, self.person_ids, person_id)
+
+    def person_ids_for_name(self, name):
+        """ Returns the person_ids whose name matches NAME, ignoring case. """
+        name = name.lower()
+        key = lambda p: self.person_names[p].lower()
+        i = bisect_left(self.name_order, name, key=key)
+        person_ids = []
+        while i < len(self.name_order) and key(self.name_order[i]) == name:
+            person_ids.append(self.person_ids[self.name_order[i]])
+            i += 1
+        return person_ids
+
+    def people_view(self):
+        """ A read-only stand-in for degrees.people backed by this graph. """
+        return PeopleView(self)
+
+    def movies_view(self):
+        """ A read-only stand-in for degrees.movies backed by this graph. """
+        return MoviesView(self)
+
+    def names_view(self):
+        """ A read-only stand-in for degrees.names backed by this graph. """
+        return NamesView(self)
+
+    def movie_index(self, movie_id):
+        """ Returns the dense int for MOVIE_ID, or None if unknown. """
+        if self._movie_index is not None:
+            return self._movie_index.get(movie_id)
+        return find_sorted(self.movie_id_order, self.movie_ids, movie_id)
+
+    def same_component(self, source, target):
+        """
+        Same contract as degrees.same_component: False only when SOURCE
+        and TARGET are known to be in different components.
+        """
+        s, t = self.person_index(source), self.person_index(target)
+        if s is None or t is None:
+            return True
+        return self.components[s] == self.components[t]
+
+    def component_sizes(self):
+        """ Returns {component label: number of people}. """
+        return dict(Counter(self.components))
+
+    def movie_count(self, p):
+        """ how many movies person int P starred in """
+        return self.person_offsets[p + 1] - self.person_offsets[p]
+
+    def movies_of(self, p):
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p):
+        """ Yields (movie int, person int) pairs for person int P. """
+        for m in self.movies_of(p):
+            for q in self.stars_of(m):
+                yield m, q
+
+    def neighbors_for_person(self, person_id):
+        """
+        Same contract as degrees.neighbors_for_person: a set of
+        (movie_id, person_id) pairs for people who starred with PERSON_ID.
+        """
+        return {(self.movie_ids[m], self.person_ids[q])
+                for m, q in self.neighbors(self.person_index(person_id))}
+
+    def shortest_path(self, source, target):
+        """
+        Same contract as degrees.shortest_path, searching the CSR
+        arrays directly. Parents live in flat arrays indexed by person
+        int, and each movie is expanded at most once.
+        """
+        return self.paths_from(source, [target])[target]
+
+    def paths_from(self, source, targets):
+        """
+        Returns {target: path or None} for every person_id in TARGETS,
+        from a single BFS out of SOURCE that stops once all of them
+        have been reached.
+        """
+        s = self.person_index(source)
+        paths = {target: None for target in targets}
+        if s is None:
+            return paths
+        wanted = {self.person_index(t): t for t in targets}
+        # people in other components can never be reached; don't wait for them
+        reachable = {t for t in wanted
+                     if t is not None and self.components[t] == self.components[s]}
+        if not reachable:
+            return paths
+        parent_person, parent_movie = self.search(s, reachable)
+        for t in reachable:
+            target = wanted[t]
+            if parent_person[t] == -1:
+                paths[target] = None
+            else:
+                paths[target] = self.backtrack(s, t, parent_person, parent_movie)
+        return paths
+
+    def search(self, s, targets=None):
+        """
+        Breadth-first search from person int S. Returns the
+        (parent_person, parent_movie) arrays, with -1 for people not
+        reached and parent_person[s] == s. When TARGETS (a set of
+        person ints) is given, stops as soon as all of them are reached.
+        """
+        parent_person = array(INDEX_TYPE, [-1]) * len(self.person_ids)
+        parent_movie = array(INDEX_TYPE, [-1]) * len(self.person_ids)
+        seen_movie = bytearray(len(self.movie_ids))
+        parent_person[s] = s
+        remaining = None if targets is None else set(targets) - {s}
+        if remaining is not None and not remaining:
+            return parent_person, parent_movie
+        layer = [s]
+        while layer:
+            next_layer = []
+            for p in layer:
+                for m in self.movies_of(p):
+                    if seen_movie[m]:
+                        continue
+                    seen_movie[m] = 1
+                    for q in self.stars_of(m):
+                        if parent_person[q] != -1:
+                            continue
+                        parent_person[q] = p
+                        parent_movie[q] = m
+                        if remaining is not None and q in remaining:
+                            remaining.discard(q)
+                            if not remaining:
+                                return parent_person, parent_movie
+                        next_layer.append(q)
+            layer = next_layer
+        return parent_person, parent_movie
+
+    def backtrack(self, s, t, parent_person, parent_movie):
+        """ the (movie_id, person_id) path from S to T in a search tree """
+        path = []
+        while t != s:
+            path.append((self.movie_ids[parent_movie[t]], self.person_ids[t]))
+            t = parent_person[t]
+        return path[::-1]
+
+
+class PeopleView(Mapping):
+    """ person_id -> {"name", "birth", "movies"}, decoded on access """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        g = self.graph
+        p = g.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return {
+            "name": g.person_names[p],
+            "birth": g.person_births[p],
+            "movies": {g.movie_ids[m] for m in g.movies_of(p)}
+        }
+
+    def __contains__(self, person_id):
+        # without decoding the movie set, as __getitem__ would
+        return self.graph.person_index(person_id) is not None
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """ movie_id -> {"title", "year", "stars"}, decoded on access """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        g = self.graph
+        m = g.movie_index(movie_id)
+        if m is None:
+            raise KeyError(movie_id)
+        return {
+            "title": g.movie_titles[m],
+            "year": g.movie_years[m],
+            "stars": {g.person_ids[q] for q in g.stars_of(m)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """ lowercased name -> set of person_ids, via the sorted name index """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        person_ids = self.graph.person_ids_for_name(name)
+        if not person_ids or name != name.lower():
+            raise KeyError(name)
+        return set(person_ids)
+
+    def __iter__(self):
+        g = self.graph
+        previous = None
+        for p in g.name_order:
+            name = g.person_names[p].lower()
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def sorted_order(values):
+    """ Returns the indexes of VALUES in sorted order, as an int array. """
+    return array(INDEX_TYPE, sorted(range(len(values)), key=values.__getitem__))
+
+
+def find_sorted(order, values, value):
+    """
+    Returns the index i with values[i] == VALUE, given ORDER from
+    sorted_order(values), or None if VALUE is absent.
+    """
+    i = bisect_left(order, value, key=values.__getitem__)
+    if i < len(order) and values[order[i]] == value:
+        return order[i]
+    return None
+
+
+def label_components(size, movie_offsets, movie_stars):
+    """
+    Union-find over person ints: everyone in a movie shares a
+    component. Returns an array mapping each person to its root.
+    """
+    parent = array(INDEX_TYPE, range(size))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for m in range(len(movie_offsets) - 1):
+        start, end = movie_offsets[m], movie_offsets[m + 1]
+        if end - start < 2:
+            continue
+        root = find(movie_stars[start])
+        for i in range(start + 1, end):
+            other = find(movie_stars[i])
+            if other != root:
+                # attach to the smaller int so labels are deterministic
+                if other < root:
+                    root, other = other, root
+                parent[other] = root
+    for x in range(size):
+        parent[x] = find(x)
+    return parent
+
+
+def csr(size, rows, cols):
+    """
+    Counting-sort the (rows[i], cols[i]) edges into CSR form.
+    Returns (offsets, indices) where row r's entries are
+    indices[offsets[r]:offsets[r + 1]].
+    """
+    offsets = array(INDEX_TYPE, [0]) * (size + 1)
+    for r in rows:
+        offsets[r + 1] += 1
+    for r in range(size):
+        offsets[r + 1] += offsets[r]
+    cursor = array(INDEX_TYPE, offsets[:-1])
+    indices = array(INDEX_TYPE, [0]) * len(rows)
+    for r, c in zip(rows, cols):
+        indices[cursor[r]] = c
+        cursor[r] += 1
+    return offsets, indices
@@ -0,0 +1,195 @@
+"""
+Landmark (ALT) distance index for degrees.
+
+A handful of well-connected "landmark" people are picked, and the BFS
+distance from each landmark to every person is stored in one byte per
+person. By the triangle inequality, for any landmark L
+
+    dist(u, t) >= |dist(L, u) - dist(L, t)|
+
+which gives an admissible, consistent A* heuristic, plus instant
+"not connected" and "at least k hops" answers.
+
+    python landmarks.py [directory] [--landmarks K] [--output FILE]
+"""
+
+import argparse
+import heapq
+import json
+from array import array
+
+import degrees
+
+# distances are stored as bytes; this marks "not reachable from the landmark"
+UNREACHABLE = 255
+FILENAME = "landmarks.index"
+
+
+class LandmarkIndex():
+    def __init__(self, person_ids, landmarks, distances):
+        self.person_ids = person_ids
+        self.index = {p: i for i, p in enumerate(person_ids)}
+        self.landmarks = landmarks
+        # distances[k][i]: hops from landmarks[k] to person_ids[i]
+        self.distances = distances
+
+    @classmethod
+    def build(cls, count=16):
+        """
+        Build an index over the currently loaded degrees data, using
+        the COUNT people who starred in the most movies as landmarks.
+        """
+        person_ids = list(degrees.people)
+        index = {p: i for i, p in enumerate(person_ids)}
+        landmarks = choose_landmarks(count)
+        distances = [bfs_distances(landmark, index) for landmark in landmarks]
+        return cls(person_ids, landmarks, distances)
+
+    def save(self, path):
+        header = json.dumps({"landmarks": self.landmarks,
+                             "person_ids": self.person_ids}).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(header + b"\n")
+            for row in self.distances:
+                row.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            distances = []
+            for _ in header["landmarks"]:
+                row = array("B")
+                row.fromfile(f, len(header["person_ids"]))
+                distances.append(row)
+        return cls(header["person_ids"], header["landmarks"], distances)
+
+    def lower_bound(self, source, target):
+        """
+        A lower bound on the degrees between SOURCE and TARGET:
+        math.inf if some landmark proves them disconnected.
+        """
+        s, t = self.index[source], self.index[target]
+        bound = 0
+        for row in self.distances:
+            ds, dt = row[s], row[t]
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                if ds != dt:
+                    return float("inf")
+                continue
+            bound = max(bound, abs(ds - dt))
+        return bound
+
+    def connected(self, source, target):
+        """
+        True or False when some landmark settles it; None when no
+        landmark reaches either person.
+        """
+        s, t = self.index[source], self.index[target]
+        for row in self.distances:
+            reached = (row[s] != UNREACHABLE, row[t] != UNREACHABLE)
+            if reached == (True, True):
+                return True
+            if reached[0] != reached[1]:
+                return False
+        return None
+
+    def at_least(self, source, target, k):
+        """ True if SOURCE and TARGET are provably at least K hops apart. """
+        return self.lower_bound(source, target) >= k
+
+
+def choose_landmarks(count):
+    """ the COUNT people with the most movies, ties broken by id """
+    ranked = sorted(degrees.people,
+                    key=lambda p: (-len(degrees.people[p]["movies"]), p))
+    return ranked[:count]
+
+
+def bfs_distances(source, index):
+    """ hops from SOURCE to every person, as one byte per person """
+    distances = array("B", [UNREACHABLE]) * len(index)
+    distances[index[source]] = 0
+    layer = [source]
+    depth = 0
+    seen_movies = set()
+    while layer:
+        # deeper people are clamped so they still read as reachable
+        depth = min(depth + 1, UNREACHABLE - 1)
+        next_layer = []
+        for person_id in layer:
+            for m in degrees.people[person_id]["movies"]:
+                if m in seen_movies:
+                    continue
+                seen_movies.add(m)
+                for p in degrees.movies[m]["stars"]:
+                    i = index[p]
+                    if distances[i] == UNREACHABLE:
+                        distances[i] = depth
+                        next_layer.append(p)
+        layer = next_layer
+    return distances
+
+
+def shortest_path(source, target, landmarks=None, stats=None):
+    """
+    A* search with landmark lower bounds; same contract as
+    degrees.shortest_path. Without LANDMARKS the heuristic is zero and
+    this is a plain uniform-cost search. If STATS is a dict, the number
+    of expanded people is stored in stats["expanded"].
+    """
+    def h(person_id):
+        return 0 if landmarks is None else landmarks.lower_bound(person_id, target)
+
+    expanded = 0
+    try:
+        if h(source) == float("inf"):
+            return None
+        parents = {source: None}
+        cost = {source: 0}
+        # (f, tie-breaker, g, person_id); the counter keeps pops FIFO on ties
+        counter = 0
+        frontier = [(h(source), counter, 0, source)]
+        closed = set()
+        while frontier:
+            _, _, g, person_id = heapq.heappop(frontier)
+            if person_id in closed:
+                continue
+            if person_id == target:
+                return degrees.path_from_tree(parents, target)
+            closed.add(person_id)
+            expanded += 1
+            for m, p in degrees.neighbors_for_person(person_id):
+                if p in closed or cost.get(p, g + 2) <= g + 1:
+                    continue
+                estimate = h(p)
+                if estimate == float("inf"):
+                    continue
+                cost[p] = g + 1
+                parents[p] = (m, person_id)
+                counter += 1
+                heapq.heappush(frontier, (g + 1 + estimate, counter, g + 1, p))
+        return None
+    finally:
+        if stats is not None:
+            stats["expanded"] = expanded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="build a landmark index")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--landmarks", type=int, default=16)
+    parser.add_argument("--output", help=f"index file (default: DIRECTORY/{FILENAME})")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory)
+    print("Data loaded.")
+    index = LandmarkIndex.build(args.landmarks)
+    output = args.output or f"{args.directory}/{FILENAME}"
+    index.save(output)
+    print(f"{len(index.landmarks)} landmarks written to {output}.")
+
+
+if __name__ == "__main__":
+    main()
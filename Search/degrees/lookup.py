@@ -0,0 +1,244 @@
+"""
+Indexed, non-interactive name lookup for degrees.
+
+NameIndex keeps every distinct lowercased name in sorted order, which
+serves as a compact prefix trie (a prefix is a contiguous bisect range),
+plus a trigram index for typo-tolerant candidates that are then ranked
+by edit distance. People sharing a name are ranked by how many movies
+they starred in, preferring a given birth year when one is supplied.
+
+The index is a handful of flat tables over person ints, so a Graph
+snapshot can store it and map it back in without rebuilding:
+
+    order                       person ints sorted by lowercased name
+    order[starts[i]:starts[i + 1]]
+                                everyone called the i-th distinct name
+    postings[gram_offsets[g]:gram_offsets[g + 1]]
+                                distinct names containing trigram grams[g]
+"""
+
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from graph import INDEX_TYPE
+
+# kind is "exact", "prefix" or "fuzzy"; distance is the edit distance
+Match = namedtuple("Match", "person_id name birth movies kind distance")
+
+# query trigrams whose postings are scanned for fuzzy candidates; a
+# single typo destroys at most three trigrams, so one of four survives
+RARE_TRIGRAMS = 4
+# postings scanned for fuzzy candidates, and candidates then checked by
+# edit distance per wanted match; these bound a fuzzy lookup's time
+MAX_CANDIDATES = 3000
+CANDIDATES_PER_MATCH = 4
+MAX_DISTANCE = 3
+# names starting with the query that are ranked for prefix matches
+PREFIX_SCAN = 1000
+
+
+class NameIndex():
+    def __init__(self, person_ids, person_names, person_births, movie_count,
+                 order, starts, grams, gram_offsets, postings):
+        """
+        PERSON_IDS, PERSON_NAMES and PERSON_BIRTHS are columns indexed
+        by person int, and MOVIE_COUNT(p) is how many movies person int
+        P starred in; the other tables are described above.
+        """
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_count = movie_count
+        self.order = order
+        self.starts = starts
+        self.grams = grams
+        self.gram_offsets = gram_offsets
+        self.postings = postings
+
+    @classmethod
+    def build(cls, person_ids, person_names, person_births, movie_count, order=None):
+        """ Index the person columns; ORDER is computed if not given. """
+        lowered = [name.lower() for name in person_names]
+        if order is None:
+            order = array(INDEX_TYPE, sorted(range(len(lowered)), key=lowered.__getitem__))
+        starts = array(INDEX_TYPE)
+        grams = {}
+        previous = None
+        for position, p in enumerate(order):
+            name = lowered[p]
+            if name == previous:
+                continue
+            previous = name
+            for gram in set(trigrams(name)):
+                grams.setdefault(gram, array(INDEX_TYPE)).append(len(starts))
+            starts.append(position)
+        starts.append(len(order))
+        gram_offsets, postings = array(INDEX_TYPE, [0]), array(INDEX_TYPE)
+        for gram in sorted(grams):
+            postings.extend(grams[gram])
+            gram_offsets.append(len(postings))
+        return cls(person_ids, person_names, person_births, movie_count,
+                   order, starts, sorted(grams), gram_offsets, postings)
+
+    @classmethod
+    def from_people(cls, people):
+        """ Index PEOPLE, a mapping shaped like degrees.people. """
+        person_ids = list(people)
+        records = [people[person_id] for person_id in person_ids]
+        return cls.build(person_ids, [person["name"] for person in records],
+                         [person["birth"] for person in records],
+                         lambda p: len(records[p]["movies"]))
+
+    @classmethod
+    def from_graph(cls, graph):
+        """ Index a Graph's people, reusing its name order. """
+        return cls.build(graph.person_ids, graph.person_names, graph.person_births,
+                         graph.movie_count, graph.name_order)
+
+    def __len__(self):
+        """ the number of distinct names """
+        return len(self.starts) - 1
+
+    def name(self, i):
+        """ the i-th distinct name, lowercased """
+        return self.person_names[self.order[self.starts[i]]].lower()
+
+    def lookup(self, query, limit=5, birth=None):
+        """
+        Returns up to LIMIT Matches for QUERY, best first: exact
+        matches, then names starting with QUERY, shortest first, then
+        near misses, closest first.
+        """
+        query = " ".join(query.lower().split())
+        matches = []
+        seen = set()
+
+        def add(i, kind, distance):
+            if i in seen:
+                return
+            seen.add(i)
+            matches.extend(self._matches(i, kind, distance, birth, limit - len(matches)))
+
+        i = bisect_left(range(len(self)), query, key=self.name)
+        if i < len(self) and self.name(i) == query:
+            add(i, "exact", 0)
+        if len(matches) < limit:
+            for distance, i in self._prefixed(query, i, limit):
+                add(i, "prefix", distance)
+        if len(matches) < limit:
+            for distance, i in self._fuzzy(query, limit):
+                add(i, "fuzzy", distance)
+        return matches[:limit]
+
+    def best(self, query, birth=None, fuzzy=False):
+        """
+        Returns the top-ranked person_id for QUERY, or None. Only
+        exact name matches count unless FUZZY is true.
+        """
+        matches = self.lookup(query, limit=1, birth=birth)
+        if not matches or (matches[0].kind != "exact" and not fuzzy):
+            return None
+        return matches[0].person_id
+
+    def batch_lookup(self, queries, birth=None, fuzzy=False):
+        """ Returns {query: best person_id or None} for QUERIES. """
+        return {query: self.best(query, birth, fuzzy) for query in queries}
+
+    def _matches(self, i, kind, distance, birth, limit):
+        """ the best LIMIT Matches for everyone called the i-th distinct name """
+        people = sorted(self.order[self.starts[i]:self.starts[i + 1]],
+                        key=lambda p: (self.person_births[p] != birth if birth else False,
+                                       -self.movie_count(p), self.person_ids[p]))
+        return [Match(self.person_ids[p], self.person_names[p], self.person_births[p],
+                      self.movie_count(p), kind, distance)
+                for p in people[:limit]]
+
+    def _postings(self, gram):
+        """ the distinct-name numbers containing GRAM (empty if none) """
+        g = bisect_left(self.grams, gram)
+        if g == len(self.grams) or self.grams[g] != gram:
+            return self.postings[0:0]
+        return self.postings[self.gram_offsets[g]:self.gram_offsets[g + 1]]
+
+    def _prefixed(self, query, i, limit):
+        """
+        (extra characters, name number) pairs for the LIMIT shortest
+        names extending QUERY, among the PREFIX_SCAN names from the I-th
+        (where QUERY would sort) on.
+        """
+        # every name extending QUERY sorts before QUERY + the last character
+        end = i + bisect_left(range(i, len(self)), query + "\U0010ffff", key=self.name)
+        names, order, starts = self.person_names, self.order, self.starts
+        # one more than LIMIT, in case QUERY itself is a name
+        shortest = heapq.nsmallest(limit + 1, range(i, min(end, i + PREFIX_SCAN)),
+                                   key=lambda k: len(names[order[starts[k]]]))
+        scored = sorted((len(self.name(k)) - len(query), k) for k in shortest)
+        return [(extra, k) for extra, k in scored if extra > 0][:limit]
+
+    def _fuzzy(self, query, limit):
+        """ (edit distance, name number) pairs for names close to QUERY """
+        grams = set(trigrams(query))
+        postings = [p for p in map(self._postings, grams) if len(p)]
+        rare = sorted(postings, key=len)[:RARE_TRIGRAMS]
+        # rank candidates by how many rare trigrams they share with the
+        # query, and spend edit distance only on the best of them
+        shared = Counter()
+        scanned = 0
+        for names in rare:
+            scanned += len(names)
+            if scanned > MAX_CANDIDATES and shared:
+                break
+            shared.update(names)
+        # each edit removes at most three of the query's trigrams, so a
+        # name sharing fewer cannot be within MAX_DISTANCE
+        needed = len(grams) - 3 * MAX_DISTANCE
+        scored = []
+        best = sorted(shared, key=shared.__getitem__, reverse=True)
+        for i in best[:limit * CANDIDATES_PER_MATCH]:
+            name = self.name(i)
+            if needed > 0 and len(grams.intersection(trigrams(name))) < needed:
+                continue
+            distance = edit_distance(query, name, MAX_DISTANCE)
+            if distance <= MAX_DISTANCE:
+                scored.append((distance, i))
+        scored.sort()
+        return scored
+
+
+def trigrams(text):
+    """ overlapping 3-character pieces of TEXT, padded at both ends """
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, cutoff):
+    """
+    Levenshtein distance between A and B, or CUTOFF + 1 if it exceeds
+    CUTOFF. Only cells within CUTOFF of the diagonal can stay within
+    CUTOFF, so each row fills just that band.
+    """
+    if abs(len(a) - len(b)) > cutoff:
+        return cutoff + 1
+    over = cutoff + 1
+    previous = [j if j <= cutoff else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        if i <= cutoff:
+            current[0] = i
+        lowest = current[0]
+        for j in range(max(1, i - cutoff), min(len(b), i + cutoff) + 1):
+            # min() of three, unrolled: this loop is most of a fuzzy lookup
+            cost = previous[j - 1] if ca == b[j - 1] else previous[j - 1] + 1
+            if previous[j] < cost:
+                cost = previous[j] + 1
+            if current[j - 1] < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < lowest:
+                lowest = cost
+        if lowest > cutoff:
+            return over
+        previous = current
+    return min(previous[-1], over)
@@ -0,0 +1,259 @@
+"""
+Long-running degrees query server, plus a load-testing client.
+
+The data is loaded once; then every request is answered from memory.
+
+    python server.py serve [directory] [--port 8050 | --unix PATH]
+    python server.py client [--port 8050 | --unix PATH] SOURCE TARGET
+
+Endpoints (GET, JSON responses):
+
+    /path?source=...&target=...   shortest path between two people
+    /person?name=...              ranked exact, prefix and fuzzy matches
+    /stats                        BFS tree cache counters
+
+SOURCE and TARGET may be person ids or names.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import degrees
+
+DEFAULT_PORT = 8050
+
+
+class BadRequest(Exception):
+    pass
+
+
+def resolve(value):
+    """
+    Returns the person_id for an id or a name; people sharing a name
+    are settled by the name index ranking rather than by asking.
+    """
+    person_id = degrees.find_person(value)
+    if person_id is None:
+        raise BadRequest(f"person not found: {value}")
+    return person_id
+
+
+def path_response(source, target):
+    source, target = resolve(source), resolve(target)
+    # cold sources get a bidirectional search; repeated ones a cached tree
+    path = degrees.cached_path(source, target)
+    if path is None:
+        return {"source": source, "target": target, "degrees": None, "path": None}
+    return {
+        "source": source,
+        "target": target,
+        "degrees": len(path),
+        "path": [{"movie_id": movie_id,
+                  "movie": degrees.movies[movie_id]["title"],
+                  "person_id": person_id,
+                  "person": degrees.people[person_id]["name"]}
+                 for movie_id, person_id in path]
+    }
+
+
+def person_response(name, limit=5):
+    matches = degrees.get_name_index().lookup(name, limit)
+    return {"name": name, "matches": [m._asdict() for m in matches]}
+
+
+def route(target):
+    """ Returns (status, body) for the request TARGET, e.g. /path?... """
+    url = urlsplit(target)
+    query = {k: v[0] for k, v in parse_qs(url.query).items()}
+    try:
+        if url.path == "/path":
+            if "source" not in query or "target" not in query:
+                raise BadRequest("source and target are required")
+            return 200, path_response(query["source"], query["target"])
+        if url.path == "/person":
+            if "name" not in query:
+                raise BadRequest("name is required")
+            return 200, person_response(query["name"])
+        if url.path == "/stats":
+            return 200, {"tree_cache": degrees.tree_cache.stats()}
+    except BadRequest as e:
+        return 400, {"error": str(e)}
+    return 404, {"error": f"no such endpoint: {url.path}"}
+
+
+async def read_request(reader):
+    """
+    Read one HTTP request head. Returns (method, target, keep_alive),
+    or None once the client has closed the connection.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, version = line.decode("latin-1").split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        headers[key.strip().lower()] = value.strip().lower()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    keep_alive = (headers.get("connection") != "close"
+                  and version == "HTTP/1.1")
+    return method, target, keep_alive
+
+
+def write_response(writer, status, body, keep_alive):
+    data = json.dumps(body).encode("utf-8")
+    reason = {200: "OK", 400: "Bad Request", 404: "Not Found",
+              405: "Method Not Allowed"}[status]
+    writer.write(
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n".encode("latin-1") + data)
+
+
+def make_handler(executor):
+    async def handle(reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, asyncio.IncompleteReadError):
+                    write_response(writer, 400, {"error": "malformed request"}, False)
+                    break
+                if request is None:
+                    break
+                method, target, keep_alive = request
+                if method != "GET":
+                    status, body = 405, {"error": "only GET is supported"}
+                else:
+                    # searches are CPU bound; keep them off the event loop
+                    status, body = await loop.run_in_executor(executor, route, target)
+                write_response(writer, status, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return handle
+
+
+async def serve(port=DEFAULT_PORT, unix=None, workers=4):
+    executor = ThreadPoolExecutor(max_workers=workers)
+    handler = make_handler(executor)
+    if unix:
+        server = await asyncio.start_unix_server(handler, path=unix)
+        print(f"Serving on {unix}")
+    else:
+        server = await asyncio.start_server(handler, "127.0.0.1", port)
+        print(f"Serving on http://127.0.0.1:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+async def open_connection(port=DEFAULT_PORT, unix=None):
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection("127.0.0.1", port)
+
+
+async def fetch(reader, writer, target):
+    """ Send one keep-alive GET and return (status, body). """
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: degrees\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        if key.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def load_test(pairs, requests=1000, concurrency=16, port=DEFAULT_PORT, unix=None):
+    """
+    Issue REQUESTS /path queries cycling through PAIRS, over
+    CONCURRENCY keep-alive connections. Returns a summary dict.
+    """
+    targets = [f"/path?{urlencode({'source': s, 'target': t})}" for s, t in pairs]
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await open_connection(port, unix)
+        try:
+            for i in counter:
+                start = time.perf_counter()
+                status, _ = await fetch(reader, writer, targets[i % len(targets)])
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": 1000 * statistics.median(latencies),
+        "p99_ms": 1000 * latencies[int(0.99 * (len(latencies) - 1))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="degrees query server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="load data and answer queries")
+    serve_parser.add_argument("directory", nargs="?", default="large")
+    serve_parser.add_argument("--compact", action="store_true")
+    serve_parser.add_argument("--workers", type=int, default=4)
+    client_parser = sub.add_parser("client", help="load-test a running server")
+    client_parser.add_argument("source")
+    client_parser.add_argument("target")
+    client_parser.add_argument("--requests", type=int, default=1000)
+    client_parser.add_argument("--concurrency", type=int, default=16)
+    for p in (serve_parser, client_parser):
+        p.add_argument("--port", type=int, default=DEFAULT_PORT)
+        p.add_argument("--unix", help="serve on a Unix socket instead of TCP")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        print("Loading data...")
+        degrees.load(args.directory, compact=args.compact)
+        # build the name index now rather than on the first /person query
+        degrees.get_name_index()
+        print("Data loaded.")
+        try:
+            asyncio.run(serve(args.port, args.unix, args.workers))
+        except KeyboardInterrupt:
+            pass
+    else:
+        summary = asyncio.run(load_test([(args.source, args.target)],
+                                        args.requests, args.concurrency,
+                                        args.port, args.unix))
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
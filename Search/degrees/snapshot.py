@@ -0,0 +1,199 @@
+"""
+On-disk snapshot of a degrees Graph, memory-mapped at startup.
+
+Layout: an 8-byte magic, a 4-byte little-endian header length, a JSON
+header, then 8-byte-aligned sections. Each integer table of the Graph
+is stored as raw machine ints, and each string column as a utf-8 blob
+plus an offsets table. The name lookup index is stored the same way,
+so it is mapped in rather than rebuilt. The header records the size,
+mtime and sha256 of each CSV file the snapshot was built from.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from graph import Graph, INDEX_TYPE
+from lookup import NameIndex
+
+MAGIC = b"DEGSNAP3"
+FILENAME = "graph.snapshot"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+INT_SECTIONS = ["person_offsets", "person_movies", "movie_offsets",
+                "movie_stars", "name_order", "person_id_order",
+                "movie_id_order", "components"]
+STRING_SECTIONS = ["person_ids", "person_names", "person_births",
+                   "movie_ids", "movie_titles", "movie_years"]
+# the NameIndex tables, stored as name_index.<table>
+INDEX_INT_SECTIONS = ["starts", "gram_offsets", "postings"]
+INDEX_STRING_SECTIONS = ["grams"]
+
+
+class StringTable():
+    """ A read-only list of strings decoded lazily from a utf-8 blob """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_info(directory):
+    """ size, mtime and hash of each CSV file in DIRECTORY """
+    info = {}
+    for name in SOURCES:
+        path = os.path.join(directory, name)
+        stat = os.stat(path)
+        info[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_sha256(path)
+        }
+    return info
+
+
+def is_fresh(directory, sources):
+    """
+    Check the recorded SOURCES against DIRECTORY's CSV files.
+    Files whose mtime changed are hashed, so a touch alone does not
+    invalidate the snapshot.
+    """
+    for name in SOURCES:
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        recorded = sources.get(name)
+        if recorded is None or stat.st_size != recorded["size"]:
+            return False
+        if (stat.st_mtime_ns != recorded["mtime_ns"]
+                and file_sha256(path) != recorded["sha256"]):
+            return False
+    return True
+
+
+def build(directory, path=None):
+    """
+    Load DIRECTORY's CSV files and write a snapshot of the Graph
+    to PATH (graph.snapshot inside DIRECTORY by default).
+    Returns the Graph that was written.
+    """
+    path = path or snapshot_path(directory)
+    sources = source_info(directory)
+    graph = Graph.load(directory)
+
+    graph.name_index = NameIndex.from_graph(graph)
+
+    tables = [(name, getattr(graph, name)) for name in INT_SECTIONS]
+    tables += [(f"name_index.{name}", getattr(graph.name_index, name))
+               for name in INDEX_INT_SECTIONS]
+    columns = [(name, getattr(graph, name)) for name in STRING_SECTIONS]
+    columns += [(f"name_index.{name}", getattr(graph.name_index, name))
+                for name in INDEX_STRING_SECTIONS]
+    blobs = []
+    for name, values in tables:
+        blobs.append((name, INDEX_TYPE, array(INDEX_TYPE, values).tobytes()))
+    for name, values in columns:
+        offsets = array("q", [0])
+        encoded = []
+        for value in values:
+            data = value.encode("utf-8")
+            encoded.append(data)
+            offsets.append(offsets[-1] + len(data))
+        blobs.append((f"{name}.offsets", "q", offsets.tobytes()))
+        blobs.append((f"{name}.blob", "B", b"".join(encoded)))
+
+    # section offsets are relative to the end of the header
+    sections = {}
+    position = 0
+    for name, typecode, data in blobs:
+        position = align(position)
+        sections[name] = {"typecode": typecode, "offset": position,
+                          "length": len(data)}
+        position += len(data)
+    header = json.dumps({"sources": sources, "sections": sections}).encode()
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(bytes(align(f.tell()) - f.tell()))
+        start = f.tell()
+        for name, typecode, data in blobs:
+            f.write(bytes(start + sections[name]["offset"] - f.tell()))
+            f.write(data)
+    os.replace(tmp, path)
+    return graph
+
+
+def load(directory, path=None):
+    """
+    Memory-map the snapshot for DIRECTORY and return a Graph over it.
+    Returns None if there is no snapshot, or if it is stale.
+    """
+    path = path or snapshot_path(directory)
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        header_length, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length))
+        if not is_fresh(directory, header["sources"]):
+            return None
+        start = align(f.tell())
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def section(name):
+        info = header["sections"][name]
+        offset = start + info["offset"]
+        return view[offset:offset + info["length"]].cast(info["typecode"])
+
+    def strings(name):
+        return StringTable(section(f"{name}.offsets"), section(f"{name}.blob"))
+
+    columns = {name: section(name) for name in INT_SECTIONS}
+    for name in STRING_SECTIONS:
+        columns[name] = strings(name)
+    graph = Graph(**columns)
+    tables = {name: section(f"name_index.{name}") for name in INDEX_INT_SECTIONS}
+    for name in INDEX_STRING_SECTIONS:
+        tables[name] = strings(f"name_index.{name}")
+    graph.name_index = NameIndex(graph.person_ids, graph.person_names,
+                                 graph.person_births, graph.movie_count,
+                                 graph.name_order, **tables)
+    return graph
+
+
+def align(position):
+    """ round POSITION up to a multiple of 8 """
+    return (position + 7) & ~7
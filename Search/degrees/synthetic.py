@@ -0,0 +1,96 @@
+"""
+Synthetic degrees datasets with IMDb-like degree distributions.
+
+Cast sizes are heavy-tailed (Pareto), and stars are picked by
+preferential attachment: most credits go to someone already credited,
+in proportion to how many credits they have, so film counts per person
+follow a power law with a few very well-connected hubs. Names are drawn
+from small first/last pools so that shared names occur, as they do in
+the real data.
+
+    python synthetic.py DIRECTORY PEOPLE [--seed N]
+"""
+
+import argparse
+import csv
+import os
+import random
+
+FIRST = ["Alex", "Anna", "Ben", "Carla", "Chris", "Dana", "Eli", "Emma",
+         "Frank", "Grace", "Hugo", "Ivy", "Jack", "Kate", "Leo", "Mia",
+         "Nina", "Omar", "Paul", "Rosa", "Sam", "Tara", "Uma", "Victor",
+         "Wes", "Yara", "Zoe"]
+LAST = ["Adams", "Baker", "Chen", "Diaz", "Evans", "Fischer", "Garcia",
+        "Hall", "Ito", "Jones", "Kim", "Lopez", "Miller", "Novak", "Ortiz",
+        "Patel", "Quinn", "Rossi", "Smith", "Tanaka", "Ueda", "Vargas",
+        "Walsh", "Young", "Zhang"]
+
+# movies per person, as in the real IMDb extract
+MOVIES_PER_PERSON = 0.25
+# chance that a credit goes to a uniformly chosen person, not a hub
+NEW_FACE = 0.5
+# cast sizes are CAST_SCALE * Pareto(1.5): median about 5, mean about 9
+CAST_SCALE = 3
+MAX_CAST = 200
+
+
+def generate(directory, people, seed=0):
+    """
+    Write people.csv, movies.csv and stars.csv for PEOPLE people into
+    DIRECTORY. Returns (people, movies, credits) counts.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    movies = max(1, int(people * MOVIES_PER_PERSON))
+
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8", newline="") as f:
+        f.write("id,name,birth\n")
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        for i in range(people):
+            # suffix numbers keep most names unique while pools repeat
+            suffix = "" if rng.random() < 0.2 else f" {rng.randrange(people)}"
+            name = f"{rng.choice(FIRST)} {rng.choice(LAST)}{suffix}"
+            birth = "" if rng.random() < 0.3 else rng.randint(1900, 2010)
+            writer.writerow([i + 1, name, birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8", newline="") as f:
+        f.write("id,title,year\n")
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC)
+        for i in range(movies):
+            writer.writerow([i + 1, f"Movie {i + 1}", rng.randint(1920, 2020)])
+
+    # every credit appends its person here, so picking uniformly from it
+    # picks people in proportion to their film count
+    credited = []
+    credits = 0
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(1, movies + 1):
+            cast = min(MAX_CAST, int(CAST_SCALE * rng.paretovariate(1.5)))
+            stars = set()
+            for _ in range(cast):
+                if not credited or rng.random() < NEW_FACE:
+                    stars.add(rng.randrange(people) + 1)
+                else:
+                    stars.add(rng.choice(credited))
+            for star in stars:
+                writer.writerow([star, movie])
+            credited.extend(stars)
+            credits += len(stars)
+    return people, movies, credits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate a synthetic degrees dataset")
+    parser.add_argument("directory")
+    parser.add_argument("people", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    people, movies, credits = generate(args.directory, args.people, args.seed)
+    print(f"{people} people, {movies} movies, {credits} credits "
+          f"written to {args.directory}.")
+
+
+if __name__ == "__main__":
+    main()
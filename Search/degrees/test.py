@@ -0,0 +1,464 @@
+import csv
+import os
+import statistics
+
+import degrees
+import snapshot
+from graph import Graph
+from lookup import NameIndex
+from util import LRUCache, Node, QueueFrontier, StackFrontier
+
+SMALL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "small")
+
+degrees.load_data(SMALL)
+
+
+def assert_valid_path(source, target, path):
+    """ every hop must be a shared movie, ending at the target """
+    current = source
+    for movie_id, person_id in path:
+        assert movie_id in degrees.people[current]["movies"]
+        assert person_id in degrees.movies[movie_id]["stars"]
+        current = person_id
+    assert current == target
+
+
+def test_bidirectional_matches_bfs():
+    """shortest_path_bidirectional finds paths as short as shortest_path"""
+    for source in degrees.people:
+        for target in degrees.people:
+            expected = degrees.shortest_path(source, target)
+            actual = degrees.shortest_path_bidirectional(source, target)
+            if expected is None:
+                assert actual is None
+            else:
+                assert len(actual) == len(expected)
+                assert_valid_path(source, target, actual)
+
+
+def test_bidirectional_same_person():
+    """a person is zero degrees away from themselves"""
+    assert degrees.shortest_path_bidirectional("102", "102") == []
+
+
+def test_frontier_contains_state():
+    """frontiers keep contains_state in step with add and remove"""
+    for frontier_class in (StackFrontier, QueueFrontier):
+        frontier = frontier_class()
+        for state in ["a", "b", "a"]:
+            frontier.add(Node(state, None, None))
+        assert frontier.contains_state("b")
+        frontier.remove()
+        assert frontier.contains_state("a")
+        frontier.remove()
+        frontier.remove()
+        assert not frontier.contains_state("a")
+        assert frontier.empty()
+
+
+def test_graph_matches_dicts():
+    """the CSR graph reproduces load_data's neighbors and path lengths"""
+    g = Graph.load(SMALL)
+    assert Graph.from_data(degrees.people, degrees.movies).movie_stars
+    for person_id in degrees.people:
+        assert g.neighbors_for_person(person_id) == degrees.neighbors_for_person(person_id)
+    for name, person_ids in degrees.names.items():
+        assert set(g.person_ids_for_name(name)) == person_ids
+    for source in degrees.people:
+        for target in degrees.people:
+            expected = degrees.shortest_path(source, target)
+            actual = g.shortest_path(source, target)
+            if expected is None:
+                assert actual is None
+            else:
+                assert len(actual) == len(expected)
+                assert_valid_path(source, target, actual)
+
+
+def test_graph_load_matches_load_data(tmp_path):
+    """Graph.load reads the files load_data accepts: blank lines, any column order"""
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for name in snapshot.SOURCES:
+        with open(os.path.join(SMALL, name), encoding="utf-8", newline="") as f:
+            rows = list(csv.reader(f))
+        # reverse the columns and end with a blank line
+        with open(directory / name, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows([row[::-1] for row in rows])
+            f.write("\r\n")
+    g = Graph.load(directory)
+    assert list(g.person_ids) == list(degrees.people)
+    for person_id in degrees.people:
+        assert g.neighbors_for_person(person_id) == degrees.neighbors_for_person(person_id)
+        assert g.person_names[g.person_index(person_id)] == degrees.people[person_id]["name"]
+
+
+def test_snapshot_round_trip(tmp_path):
+    """a memory-mapped snapshot answers like the graph it was built from"""
+    path = tmp_path / "graph.snapshot"
+    built = snapshot.build(SMALL, path)
+    loaded = snapshot.load(SMALL, path)
+    assert loaded is not None
+    assert list(loaded.person_ids) == list(built.person_ids)
+    assert loaded.person_ids_for_name("kevin bacon") == ["102"]
+    for source in built.person_ids:
+        for target in built.person_ids:
+            assert loaded.shortest_path(source, target) == built.shortest_path(source, target)
+    # the name index is mapped in with the graph, not rebuilt
+    assert loaded.name_index is not None
+    index = NameIndex.from_people(degrees.people)
+    for query in ["kevin bacon", "tom", "Tom Hankz", "emma"]:
+        assert loaded.name_index.lookup(query) == index.lookup(query)
+    degrees.use_graph(loaded)
+    try:
+        assert degrees.get_name_index() is loaded.name_index
+    finally:
+        degrees.load_data(SMALL)
+
+
+def test_snapshot_stale(tmp_path):
+    """a snapshot is ignored once its CSV files change"""
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for name in snapshot.SOURCES:
+        (directory / name).write_bytes(open(os.path.join(SMALL, name), "rb").read())
+    snapshot.build(directory)
+    assert snapshot.load(directory) is not None
+    with open(directory / "people.csv", "a") as f:
+        f.write('1,"New Person",1990\n')
+    assert snapshot.load(directory) is None
+
+
+def test_server_route():
+    """the server resolves names and reports paths as JSON-ready dicts"""
+    import server
+    status, body = server.route("/path?source=Kevin+Bacon&target=158")
+    assert status == 200
+    assert body["degrees"] == 1
+    assert body["path"][0]["person"] == "Tom Hanks"
+    assert server.route("/path?source=nobody&target=158")[0] == 400
+    assert server.route("/missing")[0] == 404
+
+
+def test_paths_from_matches_shortest_path():
+    """one shared search answers every target like separate searches"""
+    targets = list(degrees.people)
+    g = Graph.load(SMALL)
+    for source in degrees.people:
+        shared = degrees.paths_from(source, targets)
+        compact = g.paths_from(source, targets)
+        for target in targets:
+            expected = degrees.shortest_path(source, target)
+            for paths in (shared, compact):
+                if expected is None:
+                    assert paths[target] is None
+                else:
+                    assert len(paths[target]) == len(expected)
+                    assert_valid_path(source, target, paths[target])
+
+
+def test_landmark_astar(tmp_path):
+    """landmark bounds are admissible and A* still finds shortest paths"""
+    import landmarks
+    index = landmarks.LandmarkIndex.build(count=3)
+    index.save(tmp_path / "landmarks.index")
+    loaded = landmarks.LandmarkIndex.load(tmp_path / "landmarks.index")
+    assert loaded.distances == index.distances
+    for source in degrees.people:
+        for target in degrees.people:
+            expected = degrees.shortest_path(source, target)
+            actual = landmarks.shortest_path(source, target, loaded)
+            if expected is None:
+                assert actual is None
+                assert loaded.connected(source, target) is not True
+            else:
+                assert loaded.lower_bound(source, target) <= len(expected)
+                assert len(actual) == len(expected)
+                assert_valid_path(source, target, actual)
+
+
+def test_components():
+    """unreachable pairs are exactly the ones in different components"""
+    g = Graph.load(SMALL)
+    for source in degrees.people:
+        for target in degrees.people:
+            connected = degrees.shortest_path_bidirectional(source, target) is not None
+            assert degrees.same_component(source, target) == connected
+            assert g.same_component(source, target) == connected
+    stats = degrees.component_stats()
+    assert stats["people"] == len(degrees.people)
+    assert sorted(g.component_sizes().values(), reverse=True) == stats["top_sizes"]
+
+
+def test_cached_path():
+    """cached trees answer like fresh searches and are dropped on reload"""
+    degrees.configure_tree_cache(max_trees=2)
+    # a cold source is searched, and only gets a tree when it comes back
+    source, target = "102", "129"
+    assert len(degrees.cached_path(source, target)) == 1
+    assert source not in degrees.tree_cache
+    assert len(degrees.cached_path(source, target)) == 1
+    assert source in degrees.tree_cache
+    for source in degrees.people:
+        for target in degrees.people:
+            expected = degrees.shortest_path(source, target)
+            actual = degrees.cached_path(source, target)
+            assert (actual is None) == (expected is None)
+            if actual is not None:
+                assert len(actual) == len(expected)
+    stats = degrees.tree_cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] > 0 and stats["evictions"] > 0
+    degrees.load_data(SMALL)
+    assert len(degrees.tree_cache) == 0
+    degrees.configure_tree_cache()
+
+
+def test_unknown_people(tmp_path):
+    """unknown person_ids have no path in any storage mode, even when cached"""
+    path = tmp_path / "graph.snapshot"
+    snapshot.build(SMALL, path)
+    modes = [None, Graph.load(SMALL), snapshot.load(SMALL, path)]
+    degrees.configure_tree_cache(after=1)
+    try:
+        for g in modes:
+            if g is None:
+                degrees.load_data(SMALL)
+            else:
+                degrees.use_graph(g)
+                assert g.same_component("102", "nope")
+                assert g.paths_from("nope", ["102", "129"]) == {"102": None, "129": None}
+            assert degrees.same_component("102", "nope")
+            for source, target in [("102", "nope"), ("nope", "102"),
+                                   ("nope", "gone"), ("nope", "nope")]:
+                assert degrees.cached_path(source, target) is None
+                assert degrees.shortest_path(source, target) is None
+                assert degrees.shortest_path_bidirectional(source, target) is None
+                assert list(degrees.all_shortest_paths(source, target)) == []
+                assert list(degrees.k_shortest_paths(source, target)) == []
+            assert degrees.paths_from("nope", ["102"]) == {"102": None}
+            paths = degrees.paths_from("102", ["129", "nope"])
+            assert len(paths["129"]) == 1 and paths["nope"] is None
+    finally:
+        degrees.configure_tree_cache()
+        degrees.load_data(SMALL)
+
+
+def test_lru_cache_weight_bound():
+    """the cache evicts least recently used entries past its weight bound"""
+    cache = LRUCache(max_entries=10, max_weight=5, weight=len)
+    cache.put("a", "xx")
+    cache.put("b", "xx")
+    cache.get("a")
+    cache.put("c", "xx")
+    assert "b" not in cache and "a" in cache and "c" in cache
+    cache.put("d", "xxxxxx")
+    assert "d" not in cache
+
+
+def test_streaming_loader_matches_dictreader():
+    """the streaming loader loads what DictReader did"""
+    import benchmark
+    expected = benchmark.legacy_load_data(SMALL)
+    progress = []
+    degrees.load_data(SMALL, progress=lambda *args: progress.append(args))
+    assert (degrees.names, degrees.people, degrees.movies) == expected
+    assert {filename for filename, _, _ in progress} == {
+        "people.csv", "movies.csv", "stars.csv"}
+
+
+def test_adjacency_cache():
+    """the precomputed adjacency answers like neighbors_for_person"""
+    expected = {p: degrees.neighbors_for_person(p) for p in degrees.people}
+    degrees.build_adjacency()
+    try:
+        for person_id, neighbors in expected.items():
+            assert degrees.neighbors_for_person(person_id) == neighbors
+    finally:
+        degrees.drop_adjacency()
+
+
+def test_all_shortest_paths(tmp_path):
+    """every shortest path is found once, and each is valid"""
+    for source in degrees.people:
+        for target in degrees.people:
+            expected = degrees.shortest_path(source, target)
+            paths = list(degrees.all_shortest_paths(source, target))
+            if expected is None:
+                assert paths == []
+                continue
+            assert paths and len(set(map(tuple, paths))) == len(paths)
+            for path in paths:
+                assert len(path) == len(expected)
+                assert_valid_path(source, target, path)
+            # and none is missing: they are all the simple paths that short
+            shortest = set()
+            for path in degrees.k_shortest_paths(source, target):
+                if len(path) > len(expected):
+                    break
+                shortest.add(tuple(path))
+            assert set(map(tuple, paths)) == shortest
+
+    # both stars of the first layer reach t through the same movie
+    write_dataset(tmp_path / "triangle", ["s", "a", "b", "t"], {
+        "1": ["s", "a"], "2": ["s", "b"], "3": ["a", "b", "t"]})
+    degrees.load_data(tmp_path / "triangle")
+    try:
+        assert sorted(degrees.all_shortest_paths("s", "t")) == [
+            [("1", "a"), ("3", "t")], [("2", "b"), ("3", "t")]]
+    finally:
+        degrees.load_data(SMALL)
+
+
+def write_dataset(directory, people, movies):
+    """ write a tiny dataset; MOVIES maps movie ids to lists of person ids """
+    directory.mkdir()
+    with open(directory / "people.csv", "w") as f:
+        f.write("id,name,birth\n")
+        for person_id in people:
+            f.write(f'{person_id},"Person {person_id}",1970\n')
+    with open(directory / "movies.csv", "w") as f:
+        f.write("id,title,year\n")
+        for movie_id in movies:
+            f.write(f'{movie_id},"Movie {movie_id}",2000\n')
+    with open(directory / "stars.csv", "w") as f:
+        f.write("person_id,movie_id\n")
+        for movie_id, stars in movies.items():
+            for person_id in stars:
+                f.write(f"{person_id},{movie_id}\n")
+
+
+def test_k_shortest_paths(tmp_path):
+    """k_shortest_paths yields every simple path, shortest first"""
+    # a square A-B-D / A-C-D with a B-C diagonal
+    write_dataset(tmp_path / "square", ["a", "b", "c", "d"], {
+        "1": ["a", "b"], "2": ["b", "d"], "3": ["a", "c"],
+        "4": ["c", "d"], "5": ["b", "c"]})
+    degrees.load_data(tmp_path / "square")
+    try:
+        paths = list(degrees.k_shortest_paths("a", "d"))
+        assert [len(path) for path in paths] == [2, 2, 3, 3]
+        assert len(set(map(tuple, paths))) == 4
+        for path in paths:
+            assert_valid_path("a", "d", path)
+        assert {tuple(p) for p in paths[:2]} == {
+            tuple(p) for p in degrees.all_shortest_paths("a", "d")}
+        assert len(list(degrees.k_shortest_paths("a", "d", k=3))) == 3
+    finally:
+        degrees.load_data(SMALL)
+
+
+def test_name_index():
+    """names resolve exactly, by prefix and fuzzily, with ranked duplicates"""
+    index = NameIndex.from_people({
+        "1": {"name": "Chris Evans", "birth": "1981", "movies": {"a", "b"}},
+        "2": {"name": "Chris Evans", "birth": "1950", "movies": {"c"}},
+        "3": {"name": "Chris Pratt", "birth": "1979", "movies": {"d"}},
+    })
+    assert [m.person_id for m in index.lookup("chris evans")] == ["1", "2"]
+    assert index.best("Chris Evans", birth="1950") == "2"
+    assert {m.person_id for m in index.lookup("chris")} == {"1", "2", "3"}
+    assert index.best("Chris Pratte") is None
+    assert index.best("Chris Pratte", fuzzy=True) == "3"
+    assert index.batch_lookup(["chris evans", "nobody"]) == {
+        "chris evans": "1", "nobody": None}
+    assert degrees.find_person("Kevin Bacon") == "102"
+    assert degrees.resolve_person("102") == ["102"]
+    # exact names resolve through the names map in both storage modes,
+    # without building the index
+    assert degrees.name_index is None
+    # prefix matches come shortest first, not alphabetically
+    matches = degrees.get_name_index().lookup("tom")
+    assert [(m.name, m.distance) for m in matches] == [("Tom Hanks", 6), ("Tom Cruise", 7)]
+    degrees.use_graph(Graph.from_data({
+        "1": {"name": "Chris Evans", "birth": "1981", "movies": {"a", "b"}},
+        "2": {"name": "Chris Evans", "birth": "1950", "movies": {"c"}},
+    }, {"a": {"title": "A", "year": "2000", "stars": {"1"}},
+        "b": {"title": "B", "year": "2000", "stars": {"1"}},
+        "c": {"title": "C", "year": "2000", "stars": {"2"}}}))
+    try:
+        assert degrees.resolve_person("chris  evans") == ["1", "2"]
+        assert degrees.find_person("Chris Evans", birth="1950") == "2"
+        assert degrees.find_person("Chris Evens") is None
+        assert degrees.name_index is None
+        assert degrees.find_person("Chris Evens", fuzzy=True) == "1"
+        assert degrees.name_index is not None
+    finally:
+        degrees.load_data(SMALL)
+
+
+def test_incremental_updates(tmp_path):
+    """applying a delta matches reloading, and only stale trees are dropped"""
+    import updates
+    write_dataset(tmp_path / "base", ["a", "b", "c", "d", "e", "g", "h"], {
+        "1": ["a", "b"], "2": ["b", "c"], "3": ["d", "e"], "4": ["g", "h"]})
+    delta = tmp_path / "delta"
+    delta.mkdir()
+    (delta / "people.csv").write_text('op,id,name,birth\nadd,f,"Person f",1980\n')
+    (delta / "stars.csv").write_text(
+        "op,person_id,movie_id\nadd,c,3\nadd,f,3\nremove,a,1\n")
+    degrees.load_data(tmp_path / "base")
+    degrees.configure_tree_cache(after=1)
+    try:
+        degrees.build_adjacency()
+        degrees.cached_path("d", "e")
+        degrees.cached_path("a", "b")
+        degrees.cached_path("g", "h")
+        assert not degrees.same_component("b", "d")
+        updates.apply_delta(delta)
+        # "a" lost its only credit, so its tree went stale; "d" gained a link
+        assert "a" not in degrees.tree_cache and "d" not in degrees.tree_cache
+        assert "g" in degrees.tree_cache
+        assert degrees.same_component("b", "f")
+        assert not degrees.same_component("a", "b")
+        assert len(degrees.cached_path("b", "f")) == 2
+        patched = {p: degrees.neighbors_for_person(p) for p in degrees.people}
+        updates.write_data(tmp_path / "merged")
+        degrees.load_data(tmp_path / "merged")
+        assert {p: degrees.neighbors_for_person(p) for p in degrees.people} == patched
+        assert degrees.find_person("Person f") == "f"
+    finally:
+        degrees.configure_tree_cache()
+        degrees.load_data(SMALL)
+
+
+def test_synthetic_dataset(tmp_path):
+    """generated datasets load cleanly and have heavy-tailed film counts"""
+    import synthetic
+    people, movies, credits = synthetic.generate(tmp_path / "syn", 2000, seed=1)
+    degrees.load_data(tmp_path / "syn")
+    try:
+        assert len(degrees.people) == people and len(degrees.movies) == movies
+        assert sum(len(m["stars"]) for m in degrees.movies.values()) == credits
+        counts = sorted(len(p["movies"]) for p in degrees.people.values())
+        assert counts[-1] > 5 * statistics.median(counts)
+    finally:
+        degrees.load_data(SMALL)
+
+
+def test_lean_bfs_allocations(tmp_path):
+    """the lean BFS finds paths as short as the legacy BFS with far smaller allocations"""
+    import benchmark
+    import synthetic
+    synthetic.generate(tmp_path / "syn", 500, seed=2)
+    degrees.load_data(tmp_path / "syn")
+    try:
+        # targets at least 3 hops away, so neither search can finish
+        # early whatever order the sets are walked in
+        source = min(degrees.people)
+        depths = degrees.bfs_depths(source)
+        targets = sorted(p for p, d in depths.items() if d >= 3)[:3]
+        assert len(targets) == 3
+        legacy_total = lean_total = 0
+        for target in targets:
+            legacy_peak, legacy = benchmark.allocation_peak(
+                benchmark.legacy_shortest_path, source, target)
+            lean_peak, lean = benchmark.allocation_peak(
+                degrees.shortest_path, source, target)
+            assert len(lean) == len(legacy)
+            assert_valid_path(source, target, lean)
+            legacy_total += legacy_peak
+            lean_total += lean_peak
+        assert lean_total * 4 < legacy_total
+    finally:
+        degrees.load_data(SMALL)
@@ -0,0 +1,244 @@
+"""
+Incremental updates to loaded degrees data.
+
+Each change edits names, people and movies in place and keeps the
+derived state in step: components are merged on new credits (and
+relabelled lazily after removals), only cached BFS trees that reach
+the touched people are dropped, and precomputed adjacency is patched
+for the affected people only.
+
+Delta files are CSVs shaped like the originals with a leading "op"
+column of "add" or "remove", any of which may be missing:
+
+    people.csv  op,id,name,birth
+    movies.csv  op,id,title,year
+    stars.csv   op,person_id,movie_id
+
+    python updates.py DIRECTORY DELTA_DIRECTORY [--write OUTPUT_DIRECTORY]
+"""
+
+import argparse
+import csv
+import os
+
+import degrees
+
+
+def check_mutable():
+    if degrees.graph is not None:
+        raise RuntimeError("the compact graph is read-only; use load_data to apply updates")
+
+
+def forget_trees(person_ids):
+    """ Drop cached BFS trees that reached any of PERSON_IDS. """
+    person_ids = set(person_ids)
+    degrees.tree_cache.discard_where(lambda tree: not person_ids.isdisjoint(tree))
+
+
+def refresh_adjacency(person_ids):
+    """ Recompute precomputed neighbors for PERSON_IDS, if there are any. """
+    if degrees.adjacency is None:
+        return
+    for person_id in person_ids:
+        if person_id in degrees.people:
+            degrees.adjacency[person_id] = frozenset(
+                (m, p) for m in degrees.people[person_id]["movies"]
+                for p in degrees.movies[m]["stars"])
+        else:
+            degrees.adjacency.pop(person_id, None)
+
+
+def add_person(person_id, name, birth):
+    """ Add a person with no movies, or rename an existing one. """
+    check_mutable()
+    if person_id in degrees.people:
+        remove_name(person_id)
+        degrees.people[person_id]["name"] = name
+        degrees.people[person_id]["birth"] = birth
+    else:
+        degrees.people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        if degrees.components is not None:
+            degrees.components.add(person_id)
+        if degrees.adjacency is not None:
+            degrees.adjacency[person_id] = frozenset()
+    degrees.names.setdefault(name.lower(), set()).add(person_id)
+    degrees.name_index = None
+
+
+def remove_person(person_id):
+    """ Remove a person and all of their credits. """
+    check_mutable()
+    if person_id not in degrees.people:
+        return
+    for movie_id in list(degrees.people[person_id]["movies"]):
+        remove_star(person_id, movie_id)
+    remove_name(person_id)
+    del degrees.people[person_id]
+    # union-find cannot forget a member, so relabel on next use
+    degrees.components = None
+    refresh_adjacency([person_id])
+    degrees.name_index = None
+    # the person may be the source key of a cached tree
+    degrees.tree_cache.discard(person_id)
+
+
+def remove_name(person_id):
+    name = degrees.people[person_id]["name"].lower()
+    person_ids = degrees.names.get(name, set())
+    person_ids.discard(person_id)
+    if not person_ids:
+        degrees.names.pop(name, None)
+
+
+def add_movie(movie_id, title, year):
+    """ Add a movie with no stars, or retitle an existing one. """
+    check_mutable()
+    if movie_id in degrees.movies:
+        degrees.movies[movie_id]["title"] = title
+        degrees.movies[movie_id]["year"] = year
+    else:
+        degrees.movies[movie_id] = {"title": title, "year": year, "stars": set()}
+
+
+def remove_movie(movie_id):
+    """ Remove a movie and all of its credits. """
+    check_mutable()
+    if movie_id not in degrees.movies:
+        return
+    for person_id in list(degrees.movies[movie_id]["stars"]):
+        remove_star(person_id, movie_id)
+    del degrees.movies[movie_id]
+
+
+def add_star(person_id, movie_id):
+    """
+    Credit PERSON_ID in MOVIE_ID. Unknown ids are ignored, as in
+    load_data.
+    """
+    check_mutable()
+    if person_id not in degrees.people or movie_id not in degrees.movies:
+        return
+    stars = degrees.movies[movie_id]["stars"]
+    if person_id in stars:
+        return
+    affected = stars | {person_id}
+    # a new edge can shorten paths in any tree that reaches either side
+    forget_trees(affected)
+    degrees.people[person_id]["movies"].add(movie_id)
+    stars.add(person_id)
+    if degrees.components is not None:
+        for other in stars:
+            degrees.components.union(person_id, other)
+    refresh_adjacency(affected)
+
+
+def remove_star(person_id, movie_id):
+    """ Remove PERSON_ID's credit in MOVIE_ID, if there is one. """
+    check_mutable()
+    if movie_id not in degrees.movies:
+        return
+    stars = degrees.movies[movie_id]["stars"]
+    if person_id not in stars:
+        return
+    affected = set(stars)
+    # only trees that reached this person can have used the edge
+    forget_trees([person_id])
+    stars.discard(person_id)
+    degrees.people[person_id]["movies"].discard(movie_id)
+    if len(affected) > 1:
+        # the component may have split; relabel on next use
+        degrees.components = None
+    refresh_adjacency(affected)
+
+
+def read_delta(path):
+    """ Yields (op, row dict) from a delta CSV, if the file exists. """
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            op = row.pop("op")
+            if op not in ("add", "remove"):
+                raise ValueError(f"{path}: unknown op {op!r}")
+            yield op, row
+
+
+def apply_delta(directory):
+    """
+    Apply the delta CSVs in DIRECTORY. Additions of people and movies
+    go first so that new credits can refer to them; removals of people
+    and movies go last. Returns {change: count}.
+    """
+    counts = dict.fromkeys(["people_added", "people_removed", "movies_added",
+                            "movies_removed", "stars_added", "stars_removed"], 0)
+    people = list(read_delta(os.path.join(directory, "people.csv")))
+    movies = list(read_delta(os.path.join(directory, "movies.csv")))
+    stars = list(read_delta(os.path.join(directory, "stars.csv")))
+
+    for op, row in people:
+        if op == "add":
+            add_person(row["id"], row["name"], row["birth"])
+            counts["people_added"] += 1
+    for op, row in movies:
+        if op == "add":
+            add_movie(row["id"], row["title"], row["year"])
+            counts["movies_added"] += 1
+    for op, row in stars:
+        if op == "remove":
+            remove_star(row["person_id"], row["movie_id"])
+            counts["stars_removed"] += 1
+    for op, row in stars:
+        if op == "add":
+            add_star(row["person_id"], row["movie_id"])
+            counts["stars_added"] += 1
+    for op, row in movies:
+        if op == "remove":
+            remove_movie(row["id"])
+            counts["movies_removed"] += 1
+    for op, row in people:
+        if op == "remove":
+            remove_person(row["id"])
+            counts["people_removed"] += 1
+    return counts
+
+
+def write_data(directory):
+    """ Write the loaded data back out as people/movies/stars CSVs. """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person_id, person in degrees.people.items():
+            writer.writerow([person_id, person["name"], person["birth"]])
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie_id, movie in degrees.movies.items():
+            writer.writerow([movie_id, movie["title"], movie["year"]])
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id, movie in degrees.movies.items():
+            for person_id in sorted(movie["stars"]):
+                writer.writerow([person_id, movie_id])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="apply delta CSVs to degrees data")
+    parser.add_argument("directory")
+    parser.add_argument("delta")
+    parser.add_argument("--write", help="write the updated CSVs to this directory")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory)
+    print("Data loaded.")
+    for change, count in apply_delta(args.delta).items():
+        print(f"{change}: {count}")
+    if args.write:
+        write_data(args.write)
+        print(f"Updated data written to {args.write}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,21 @@
+import csv
+import operator
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+
+# Columns the loaders read from each CSV file, in unpacking order
+CSV_COLUMNS = [
+    ("people.csv", ("id", "name", "birth")),
+    ("movies.csv", ("id", "title", "year")),
+    ("stars.csv", ("person_id", "movie_id")),
+]
+
+# Rows read per chunk by the streaming CSV loader
+CHUNK_ROWS = 65536
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -9,13 +27,17 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # state -> number of nodes in the frontier holding it,
+        # so contains_state does not have to scan the frontier
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -24,9 +46,16 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            return self._forget(self.frontier.pop())
+
+    def _forget(self, node):
+        """ drop one occurrence of node.state from the state index """
+        count = self.states[node.state]
+        if count == 1:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count - 1
+        return node
 
 
 class QueueFrontier(StackFrontier):
@@ -35,6 +64,171 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            return self._forget(self.frontier.popleft())
+
+
+class DisjointSet():
+    """ Union-find with union by size and path halving """
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    @classmethod
+    def from_groups(cls, items, groups):
+        """
+        Build a set of ITEMS where the members of each group in GROUPS
+        end up together. Same result as add() and union() calls, with
+        the loops inlined for bulk loading.
+        """
+        ds = cls()
+        parent = ds.parent = {x: x for x in items}
+        size = ds.size = dict.fromkeys(parent, 1)
+        for group in groups:
+            root = None
+            for x in group:
+                while parent[x] != x:
+                    parent[x] = parent[parent[x]]
+                    x = parent[x]
+                if root is None:
+                    root = x
+                elif x != root:
+                    if size[root] < size[x]:
+                        root, x = x, root
+                    parent[x] = root
+                    size[root] += size.pop(x)
+        return ds
+
+    def add(self, x):
+        if x not in self.parent:
+            self.parent[x] = x
+            self.size[x] = 1
+
+    def __contains__(self, x):
+        return x in self.parent
+
+    def find(self, x):
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size.pop(b)
+        return a
+
+    def sizes(self):
+        """ Returns {root: number of members} for every set. """
+        return dict(self.size)
+
+
+class LRUCache():
+    """
+    Least-recently-used cache bounded by entry count and by total
+    weight, where weight(value) estimates the memory a value holds.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_entries=32, max_weight=None, weight=None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.weight = weight or (lambda value: 1)
+        self.entries = OrderedDict()
+        self.total_weight = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        weight = self.weight(value)
+        with self.lock:
+            self._discard(key)
+            if self.max_weight is not None and weight > self.max_weight:
+                # would evict everything else and still not fit
+                return
+            self._insert(key, value, weight)
+
+    def _insert(self, key, value, weight):
+        self.entries[key] = (value, weight)
+        self.total_weight += weight
+        while (len(self.entries) > self.max_entries
+               or (self.max_weight is not None
+                   and self.total_weight > self.max_weight)):
+            _, (_, old_weight) = self.entries.popitem(last=False)
+            self.total_weight -= old_weight
+            self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        if key in self.entries:
+            _, weight = self.entries.pop(key)
+            self.total_weight -= weight
+
+    def discard_where(self, predicate):
+        """ Drop every entry whose value satisfies PREDICATE. """
+        with self.lock:
+            for key in [k for k, (v, _) in self.entries.items() if predicate(v)]:
+                self._discard(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_weight = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "weight": self.total_weight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+
+def read_rows(directory, filename, columns, progress=None):
+    """
+    Yields lists of up to CHUNK_ROWS tuples holding COLUMNS, in order,
+    from the CSV file FILENAME in DIRECTORY. Blank lines are skipped.
+    """
+    with open(f"{directory}/{filename}", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        pick = operator.itemgetter(*[header.index(c) for c in columns])
+        rows = (pick(row) for row in reader if row)
+        start = time.perf_counter()
+        total = 0
+        while True:
+            chunk = list(islice(rows, CHUNK_ROWS))
+            if not chunk:
+                break
+            total += len(chunk)
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress(filename, total, total / elapsed if elapsed else 0.0)
+            yield chunk
@@ -0,0 +1,262 @@
+"""
+Benchmarks for the tic-tac-toe engine.
+
+Usage: python benchmark.py nodes
+       python benchmark.py positions [depth]
+       python benchmark.py book
+"""
+
+import copy
+import operator
+import sys
+import time
+from types import SimpleNamespace
+
+import book
+import tictactoe as ttt
+from bitboard import Bitboard
+
+
+# The original list-scanning primitives, kept only as a baseline
+
+def legacy_player(board):
+    if legacy_terminal(board):
+        return None
+    num_X, num_O = 0, 0
+    for row in board:
+        for cell in row:
+            if cell == "X": num_X += 1
+            elif cell == "O": num_O += 1
+    if num_X == num_O: return ttt.X
+    else: return ttt.O
+
+
+def legacy_actions(board):
+    if legacy_terminal(board):
+        return None
+    coordinates = set()
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == ttt.EMPTY: coordinates.add((i, j))
+    return coordinates
+
+
+def legacy_result(board, action):
+    turn = legacy_player(board)
+    valid_actions = legacy_actions(board)
+    new_board = copy.deepcopy(board)
+    if action not in valid_actions:
+        raise Exception("invalid action")
+    i, j = action[0], action[1]
+    new_board[i][j] = turn
+    return new_board
+
+
+def legacy_winner(board):
+    who_wins = None
+    def check_win_condition(pos1, pos2, pos3):
+        nonlocal who_wins
+        cell_pos1 = board[pos1[0]][pos1[1]]
+        cell_pos2 = board[pos2[0]][pos2[1]]
+        cell_pos3 = board[pos3[0]][pos3[1]]
+        if not all([cell_pos1, cell_pos2, cell_pos3]):
+            return None
+        elif cell_pos1 == cell_pos2 == cell_pos3:
+            who_wins = cell_pos1
+            return True
+    check_pos = []
+    for row in range(3):
+        check_pos.append(((row, 0), (row, 1), (row, 2)))
+    for col in range(3):
+        check_pos.append(((0, col), (1, col), (2, col)))
+    check_pos.append(((0, 0), (1, 1), (2, 2)))
+    check_pos.append(((0, 2), (1, 1), (2, 0)))
+    for args in check_pos:
+        if check_win_condition(*args) == True:
+            return who_wins
+    return None
+
+
+def legacy_terminal(board):
+    if legacy_winner(board) is not None:
+        return True
+    return not any(cell is ttt.EMPTY for row in board for cell in row)
+
+
+def legacy_utility(board):
+    who_wins = legacy_winner(board)
+    if who_wins == ttt.X: return 1
+    elif who_wins == ttt.O: return -1
+    else: return 0
+
+
+LEGACY = SimpleNamespace(player=legacy_player, actions=legacy_actions,
+                         result=legacy_result, terminal=legacy_terminal,
+                         utility=legacy_utility)
+
+
+def legacy_minimax(board, stats):
+    """
+    The original strategy-dict alpha-beta search with no table, kept
+    as a baseline. Counts visited positions in stats["nodes"].
+    """
+    strategy = {"X": {"init_value": -1, "compare_func": operator.gt},
+                "O": {"init_value": 1, "compare_func": operator.lt}}
+
+    def value_and_action(board, alpha, beta):
+        stats["nodes"] += 1
+        if legacy_terminal(board):
+            return legacy_utility(board), None
+        whos_turn = legacy_player(board)
+        value = strategy[whos_turn]["init_value"]
+        compare_func = strategy[whos_turn]["compare_func"]
+        optimal_action = None
+        for action in legacy_actions(board):
+            new_board = copy.deepcopy(board)
+            i, j = action
+            new_board[i][j] = whos_turn
+            new_value = value_and_action(new_board, alpha, beta)[0]
+            if compare_func(new_value, value):
+                value, optimal_action = new_value, action
+                if whos_turn == "X":
+                    alpha = value
+                else:
+                    beta = value
+            if beta < alpha:
+                break
+        return value, optimal_action
+    return value_and_action(board, -1, 1)[1]
+
+
+def perft(engine, board, depth):
+    """
+    Count positions in the game tree below BOARD, DEPTH plies deep,
+    using ENGINE's player/actions/result/terminal functions.
+    """
+    if depth == 0 or engine.terminal(board):
+        return 1
+    return 1 + sum(perft(engine, engine.result(board, action), depth - 1)
+                   for action in engine.actions(board))
+
+
+def perft_bitboard(position, depth):
+    """ perft on one Bitboard, playing and undoing moves in place """
+    if depth == 0 or position.terminal():
+        return 1
+    count = 1
+    for i in position.moves():
+        position.play(i)
+        count += perft_bitboard(position, depth - 1)
+        position.undo(i)
+    return count
+
+
+def bench_positions(depth=6):
+    """ Returns {engine: positions per second} for a perft to DEPTH. """
+    rates = {}
+    runs = [
+        ("legacy lists", lambda: perft(LEGACY, ttt.initial_state(), depth)),
+        ("list adapter", lambda: perft(ttt, ttt.initial_state(), depth)),
+        ("bitboard", lambda: perft_bitboard(Bitboard(), depth)),
+    ]
+    for name, run in runs:
+        start = time.perf_counter()
+        count = run()
+        rates[name] = count / (time.perf_counter() - start)
+    return rates
+
+
+def game_positions():
+    """ the positions of one optimal game, from the empty board """
+    board = ttt.initial_state()
+    positions = []
+    while not ttt.terminal(board):
+        positions.append(board)
+        board = ttt.result(board, legacy_minimax(board, {"nodes": 0}))
+    return positions
+
+
+def bench_nodes():
+    """
+    Play one optimal game, asking every search for every move.
+    Returns [(move number, legacy nodes, alpha-beta nodes, PVS nodes)],
+    the table searches starting each move from an empty table.
+    """
+    rows = []
+    for number, board in enumerate(game_positions(), 1):
+        legacy = {"nodes": 0}
+        legacy_minimax(board, legacy)
+        counts = []
+        for pvs in (False, True):
+            ttt.clear_transposition_table()
+            ttt.minimax(board, use_book=False, pvs=pvs)
+            counts.append(ttt.stats["nodes"])
+        rows.append((number, legacy["nodes"], *counts))
+    return rows
+
+
+def bench_book(repeat=100):
+    """
+    Mean seconds per move over one optimal game for the legacy search,
+    a cold table search and a book lookup.
+    """
+    positions = game_positions()
+    book.get_book()
+
+    def legacy():
+        for board in positions:
+            legacy_minimax(board, {"nodes": 0})
+
+    def search():
+        for board in positions:
+            ttt.clear_transposition_table()
+            ttt.minimax(board, use_book=False)
+
+    def lookup():
+        for board in positions:
+            ttt.minimax(board)
+
+    times = {}
+    for name, run, rounds in (("legacy", legacy, 1), ("search", search, 1),
+                              ("book", lookup, repeat)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            run()
+        times[name] = (time.perf_counter() - start) / (rounds * len(positions))
+    return times
+
+
+def nodes_main():
+    print(f"{'move':>4} {'legacy nodes':>13} {'alpha-beta':>11} {'pvs':>6}")
+    totals = [0, 0, 0]
+    for number, *counts in bench_nodes():
+        print(f"{number:>4} {counts[0]:>13} {counts[1]:>11} {counts[2]:>6}")
+        totals = [t + c for t, c in zip(totals, counts)]
+    print(f"{'all':>4} {totals[0]:>13} {totals[1]:>11} {totals[2]:>6}")
+
+
+def positions_main(args):
+    depth = int(args[0]) if args else 6
+    for name, rate in bench_positions(depth).items():
+        print(f"{name:>12}: {rate:>12,.0f} positions/s")
+
+
+def book_main():
+    for name, seconds in bench_book().items():
+        print(f"{name:>8}: {seconds * 1e6:>12,.1f} us/move")
+
+
+def main():
+    args = sys.argv[1:]
+    if args == ["nodes"]:
+        nodes_main()
+    elif args[:1] == ["positions"] and len(args) <= 2:
+        positions_main(args[1:])
+    elif args == ["book"]:
+        book_main()
+    else:
+        sys.exit(__doc__.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Bitboard core for the tic-tac-toe engine.
+
+A position is two 9-bit masks, one per player, where cell (i, j) is
+bit 3 * i + j. Win detection and move generation are table lookups
+indexed by a mask, and playing or undoing a move flips a single bit.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+WIN_MASKS = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+]
+
+# HAS_LINE[mask] is 1 if MASK covers any winning line
+HAS_LINE = bytes(any(mask & w == w for w in WIN_MASKS) for mask in range(FULL + 1))
+
+# FREE_CELLS[occupied] lists the empty cell indexes, in index order
+FREE_CELLS = [tuple(i for i in range(9) if not occupied >> i & 1)
+              for occupied in range(FULL + 1)]
+
+
+# The 8 symmetries of the board as index permutations: cell i of a
+# board (i = 3 * row + col) moves to cell SYMMETRIES[t][i]
+SYMMETRIES = [
+    [3 * r + c for r, c in cells]
+    for cells in (
+        [(i, j) for i in range(3) for j in range(3)],          # identity
+        [(j, 2 - i) for i in range(3) for j in range(3)],      # rotate 90
+        [(2 - i, 2 - j) for i in range(3) for j in range(3)],  # rotate 180
+        [(2 - j, i) for i in range(3) for j in range(3)],      # rotate 270
+        [(i, 2 - j) for i in range(3) for j in range(3)],      # mirror
+        [(2 - i, j) for i in range(3) for j in range(3)],      # flip
+        [(j, i) for i in range(3) for j in range(3)],          # transpose
+        [(2 - j, 2 - i) for i in range(3) for j in range(3)],  # anti-transpose
+    )
+]
+
+# TRANSFORMED[t][mask] is MASK with every bit moved by symmetry t
+TRANSFORMED = [
+    [sum(1 << perm[i] for i in range(9) if mask >> i & 1) for mask in range(FULL + 1)]
+    for perm in SYMMETRIES
+]
+
+
+def canonical_key(x, o):
+    """
+    Returns (key, t): KEY packs the smallest symmetric image of the
+    position as x | o << 9, and T is the symmetry producing it.
+    """
+    return min((TRANSFORMED[t][x] | TRANSFORMED[t][o] << 9, t) for t in range(8))
+
+
+class Bitboard():
+    __slots__ = ("x", "o")
+
+    def __init__(self, x=0, o=0):
+        self.x = x
+        self.o = o
+
+    @classmethod
+    def from_board(cls, board):
+        """ Build a Bitboard from a list-of-lists board. """
+        x = o = 0
+        bit = 1
+        for row in board:
+            for cell in row:
+                if cell == X:
+                    x |= bit
+                elif cell == O:
+                    o |= bit
+                bit <<= 1
+        return cls(x, o)
+
+    def to_board(self):
+        """ The list-of-lists board for this position. """
+        return [[X if self.x >> (3 * i + j) & 1 else
+                 O if self.o >> (3 * i + j) & 1 else EMPTY
+                 for j in range(3)] for i in range(3)]
+
+    def copy(self):
+        return Bitboard(self.x, self.o)
+
+    def turn(self):
+        """ X if both players have made as many moves, else O """
+        return X if self.x.bit_count() == self.o.bit_count() else O
+
+    def winner(self):
+        if HAS_LINE[self.x]:
+            return X
+        if HAS_LINE[self.o]:
+            return O
+        return None
+
+    def terminal(self):
+        return bool(HAS_LINE[self.x] or HAS_LINE[self.o]
+                    or self.x | self.o == FULL)
+
+    def utility(self):
+        """ 1 if X has won, -1 if O has won, 0 otherwise """
+        if HAS_LINE[self.x]:
+            return 1
+        if HAS_LINE[self.o]:
+            return -1
+        return 0
+
+    def moves(self):
+        """ indexes of the empty cells """
+        return FREE_CELLS[self.x | self.o]
+
+    def play(self, i):
+        """ Put the side to move on cell I. """
+        if self.x.bit_count() == self.o.bit_count():
+            self.x |= 1 << i
+        else:
+            self.o |= 1 << i
+
+    def undo(self, i):
+        """ Take back the move on cell I. """
+        self.x &= ~(1 << i)
+        self.o &= ~(1 << i)
+
+    def __eq__(self, other):
+        return isinstance(other, Bitboard) and (self.x, self.o) == (other.x, other.o)
+
+    def __hash__(self):
+        return hash((self.x, self.o))
+
+    def __repr__(self):
+        return f"Bitboard(x={self.x:#011b}, o={self.o:#011b})"
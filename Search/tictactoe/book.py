@@ -0,0 +1,113 @@
+"""
+Precomputed opening book for tic-tac-toe.
+
+solve() walks every position reachable from the empty board, folding
+the 8 symmetries together, and records each one's game value (1 if X
+wins, -1 if O wins, 0 for a draw, under perfect play) and a best move.
+The book is stored as packed 32-bit records:
+
+    bits 0-17   position key: x | o << 9, in canonical orientation
+    bits 18-19  value + 1
+    bits 20-23  best move cell index, in canonical orientation
+
+and is loaded lazily the first time it is needed.
+
+    python book.py [path]
+"""
+
+import os
+import sys
+from array import array
+
+from bitboard import Bitboard, SYMMETRIES, canonical_key
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# canonical key -> (value, best move index); None until first use
+_book = None
+
+
+def solve():
+    """ Returns {canonical key: (value, best move index)}. """
+    table = {}
+
+    def value(position):
+        """ game value of POSITION, solving and recording it if new """
+        if position.terminal():
+            return position.utility()
+        key, t = canonical_key(position.x, position.o)
+        if key in table:
+            return table[key][0]
+        maximizing = position.turn() == "X"
+        best_value, best_move = None, None
+        for i in position.moves():
+            position.play(i)
+            v = value(position)
+            position.undo(i)
+            if (best_value is None or (v > best_value if maximizing else v < best_value)):
+                best_value, best_move = v, i
+        table[key] = (best_value, SYMMETRIES[t][best_move])
+        return best_value
+
+    value(Bitboard())
+    return table
+
+
+def save(table, path=PATH):
+    records = array("I", sorted(key | (v + 1) << 18 | move << 20
+                                for key, (v, move) in table.items()))
+    if sys.byteorder != "little":
+        records.byteswap()
+    with open(path, "wb") as f:
+        records.tofile(f)
+
+
+def load(path=PATH):
+    records = array("I")
+    with open(path, "rb") as f:
+        records.frombytes(f.read())
+    if sys.byteorder != "little":
+        records.byteswap()
+    return {r & 0x3FFFF: ((r >> 18 & 3) - 1, r >> 20 & 0xF) for r in records}
+
+
+def get_book():
+    """ The book, read from disk (or solved, if the file is missing) on first use. """
+    global _book
+    if _book is None:
+        _book = load() if os.path.exists(PATH) else solve()
+    return _book
+
+
+def lookup(board):
+    """
+    Returns (value, (i, j)) for a list-of-lists BOARD, or None if the
+    position is terminal or not reachable in a legal game.
+    """
+    position = Bitboard.from_board(board)
+    key, t = canonical_key(position.x, position.o)
+    entry = get_book().get(key)
+    if entry is None:
+        return None
+    value, move = entry
+    i = SYMMETRIES[t].index(move)
+    return value, (i // 3, i % 3)
+
+
+def best_move(board):
+    """ The book move for BOARD, or None if it is not in the book. """
+    entry = lookup(board)
+    return None if entry is None else entry[1]
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [path]")
+    path = sys.argv[1] if len(sys.argv) == 2 else PATH
+    table = solve()
+    save(table, path)
+    print(f"{len(table)} positions written to {path}.")
+
+
+if __name__ == "__main__":
+    main()
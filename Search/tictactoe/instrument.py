@@ -0,0 +1,108 @@
+"""
+Search instrumentation for tictactoe.py and mnk.py.
+
+The searches always keep their cheap counters (nodes, table hits,
+cutoffs and, for tictactoe.py, nodes per ply) in their stats dicts.
+This module turns those into one record per move, with the time the
+move took, when it is enabled. It is off by default, and then costs a
+single flag test per move. Enable it with the TICTACTOE_STATS
+environment variable:
+
+    TICTACTOE_STATS=1 python runner.py                # records to stderr
+    TICTACTOE_STATS=stats.jsonl python selfplay.py games
+
+or from code with enable(). Records are kept in memory (the last
+MAX_RECORDS of them) and, given a path or "1", written out as JSON
+lines. summary() aggregates them.
+"""
+
+import json
+import os
+import statistics
+import sys
+from collections import deque
+
+ENVIRONMENT = "TICTACTOE_STATS"
+
+MAX_RECORDS = 10000
+
+enabled = False
+records = deque(maxlen=MAX_RECORDS)
+_sink = None
+
+
+def enable(path=None):
+    """
+    Start recording moves. PATH is a file to append JSON lines to,
+    "-" for stderr, or None to keep records in memory only.
+    """
+    global enabled, _sink
+    disable()
+    if path == "-":
+        _sink = sys.stderr
+    elif path is not None:
+        _sink = open(path, "a", encoding="utf-8", buffering=1)
+    enabled = True
+
+
+def disable():
+    global enabled, _sink
+    enabled = False
+    if _sink is not None and _sink is not sys.stderr:
+        _sink.close()
+    _sink = None
+
+
+def record(engine, stats, seconds, **fields):
+    """
+    Record one move of ENGINE ("tictactoe" or "mnk") from its STATS
+    dict and the SECONDS it took. Returns the record.
+    """
+    entry = {"engine": engine, "seconds": seconds}
+    for name, value in stats.items():
+        entry[name] = list(value) if isinstance(value, list) else value
+    entry.update(fields)
+    records.append(entry)
+    if _sink is not None:
+        _sink.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def summary(entries=None):
+    """
+    Aggregate ENTRIES (the kept records by default): moves, total
+    counters, the merged per-ply histogram and move time percentiles.
+    """
+    entries = list(records if entries is None else entries)
+    if not entries:
+        return {"moves": 0}
+    totals = {}
+    depths = []
+    for entry in entries:
+        for name, value in entry.items():
+            if name == "depths":
+                depths += [0] * (len(value) - len(depths))
+                for ply, count in enumerate(value):
+                    depths[ply] += count
+            elif name in ("nodes", "tt_hits", "cutoffs"):
+                totals[name] = totals.get(name, 0) + value
+    ms = sorted(1000 * entry["seconds"] for entry in entries)
+    return {
+        "moves": len(entries),
+        **totals,
+        "depths": depths,
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": ms[(len(ms) - 1) // 2],
+        "p99_ms": ms[int(0.99 * (len(ms) - 1))],
+        "max_ms": ms[-1],
+    }
+
+
+def configure_from_environment():
+    value = os.environ.get(ENVIRONMENT, "")
+    if value in ("", "0"):
+        return
+    enable("-" if value == "1" else value)
+
+
+configure_from_environment()
@@ -0,0 +1,333 @@
+"""
+Generalized m,n,k-game engine: players take turns on an m-row, n-column
+board and the first to get k in a row (across, down or diagonally) wins.
+Tic-tac-toe is MNKGame(3, 3, 3), gomoku is MNKGame(15, 15, 5).
+
+A position is two Python-int bitboards, one per player, where cell
+(i, j) is bit n * i + j. Moves are chosen by iterative-deepening
+alpha-beta under a per-move time budget: each finished depth seeds the
+move ordering of the next (transposition table move, then killer moves,
+then history and distance from the centre), and the move of the deepest
+finished depth is played when time runs out. Leaves are scored by an
+evaluation of the k-long windows still open to one side.
+"""
+
+import math
+import time
+
+import instrument
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# score of a won position, less the plies it takes to get there
+WIN = 1 << 40
+
+# transposition table bound flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# the table is dropped between moves once it grows past this many entries
+TABLE_LIMIT = 1 << 20
+
+# how often, in nodes, the search checks the clock
+CLOCK_INTERVAL = 256
+
+
+class _Timeout(Exception):
+    pass
+
+
+class MNKGame():
+    """
+    The rules and search for one board size. The board-level functions
+    take the same list-of-lists boards as tictactoe.py, so runner.py can
+    use either.
+    """
+
+    X, O, EMPTY = X, O, EMPTY
+
+    def __init__(self, m=3, n=3, k=3, time_budget=1.0):
+        if m < 1 or n < 1 or not 1 <= k <= max(m, n):
+            raise ValueError(f"no {k} in a row fits on a {m}x{n} board")
+        self.m, self.n, self.k = m, n, k
+        self.size = m * n
+        self.full = (1 << self.size) - 1
+        self.time_budget = time_budget
+
+        # every k-long window, and the windows through each cell
+        self.lines = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    cells = [(i + di * s, j + dj * s) for s in range(k)]
+                    if all(0 <= a < m and 0 <= b < n for a, b in cells):
+                        self.lines.append(sum(1 << (n * a + b) for a, b in cells))
+        self.lines_through = [[line for line in self.lines if line >> c & 1]
+                              for c in range(self.size)]
+
+        # cells within two steps of each cell: on a big board only these
+        # are worth trying next to the stones already played
+        self.near = [sum(1 << (n * a + b)
+                         for a in range(max(0, c // n - 2), min(m, c // n + 3))
+                         for b in range(max(0, c % n - 2), min(n, c % n + 3)))
+                     for c in range(self.size)]
+
+        # cells ordered from the centre outwards
+        self.by_centre = sorted(range(self.size), key=lambda c: (
+            abs(2 * (c // n) - (m - 1)) + abs(2 * (c % n) - (n - 1)), c))
+        self.centre_rank = {c: r for r, c in enumerate(self.by_centre)}
+
+        # window score by number of stones in it
+        self.weights = [0] + [4 ** s for s in range(1, k + 1)]
+
+        self.table = {}
+        self.stats = {"nodes": 0, "depth": 0, "tt_hits": 0, "cutoffs": 0}
+
+    # The board-level API
+
+    def initial_state(self):
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def masks(self, board):
+        """ (x, o) bitboards of a list-of-lists BOARD """
+        x = o = 0
+        bit = 1
+        for row in board:
+            for cell in row:
+                if cell == X:
+                    x |= bit
+                elif cell == O:
+                    o |= bit
+                bit <<= 1
+        return x, o
+
+    def has_line(self, stones):
+        return any(stones & line == line for line in self.lines)
+
+    def winner(self, board):
+        x, o = self.masks(board)
+        if self.has_line(x):
+            return X
+        if self.has_line(o):
+            return O
+        return None
+
+    def terminal(self, board):
+        x, o = self.masks(board)
+        return x | o == self.full or self.has_line(x) or self.has_line(o)
+
+    def utility(self, board):
+        """ 1 if X has won, -1 if O has won, 0 otherwise """
+        return {X: 1, O: -1, None: 0}[self.winner(board)]
+
+    def player(self, board):
+        """ The side to move, or None if the game is over. """
+        if self.terminal(board):
+            return None
+        x, o = self.masks(board)
+        return X if x.bit_count() == o.bit_count() else O
+
+    def actions(self, board):
+        if self.terminal(board):
+            return None
+        occupied = sum(self.masks(board))
+        return {(c // self.n, c % self.n) for c in range(self.size)
+                if not occupied >> c & 1}
+
+    def result(self, board, action):
+        """ Returns the board that results from making move (i, j) on the board. """
+        i, j = action
+        if (self.terminal(board) or not (0 <= i < self.m and 0 <= j < self.n)
+                or board[i][j] != EMPTY):
+            raise Exception("invalid action")
+        x, o = self.masks(board)
+        new_board = [row[:] for row in board]
+        new_board[i][j] = X if x.bit_count() == o.bit_count() else O
+        return new_board
+
+    def minimax(self, board, time_budget=None):
+        """
+        Returns the best action for the current player on the board found
+        within TIME_BUDGET seconds (the game's budget by default).
+        """
+        if self.terminal(board):
+            return None
+        me, opp = self.sides(board)
+        start = time.perf_counter()
+        c = self.best_move(me, opp, self.time_budget if time_budget is None
+                           else time_budget)
+        if instrument.enabled:
+            instrument.record("mnk", self.stats, time.perf_counter() - start,
+                              size=[self.m, self.n, self.k])
+        return c // self.n, c % self.n
+
+    def root_moves(self, board):
+        """ The actions worth searching on BOARD, best guesses first. """
+        me, opp = self.sides(board)
+        self.killers = [[] for _ in range(self.size + 1)]
+        self.history = [0] * self.size
+        return [(c // self.n, c % self.n) for c in self.candidates(me, opp, 0)]
+
+    def move_value(self, board, action, depth, alpha=-WIN - 1, beta=WIN + 1):
+        """
+        Value of ACTION for the side to move on BOARD, searched DEPTH
+        plies deep (the move included) with no time limit. A value at or
+        below ALPHA only bounds the true value from above.
+        """
+        me, opp = self.sides(board)
+        c = self.n * action[0] + action[1]
+        self.killers = [[] for _ in range(self.size + 1)]
+        self.history = [0] * self.size
+        self.deadline = math.inf
+        return -self.negamax(opp, me | 1 << c, c, depth - 1, -beta, -alpha, 1)
+
+    def sides(self, board):
+        """ (side to move, other side) bitboards of BOARD """
+        x, o = self.masks(board)
+        return (x, o) if x.bit_count() == o.bit_count() else (o, x)
+
+    # The search, on (side to move, other side) bitboards
+
+    def best_move(self, me, opp, time_budget):
+        """
+        Iterative deepening: search depth 1, 2, ... until the budget is
+        spent, the game tree is exhausted or the result is a proven win
+        or loss, and return the best cell of the deepest finished depth.
+        """
+        if len(self.table) > TABLE_LIMIT:
+            self.table.clear()
+        self.killers = [[] for _ in range(self.size + 1)]
+        self.history = [0] * self.size
+        self.deadline = time.perf_counter() + time_budget
+        self.stats.update(nodes=0, depth=0, tt_hits=0, cutoffs=0)
+
+        empty = self.size - (me | opp).bit_count()
+        best = self.candidates(me, opp, 0)[0]
+        for depth in range(1, empty + 1):
+            try:
+                value, move = self.search_root(me, opp, depth, best)
+            except _Timeout:
+                break
+            best = move
+            self.stats["depth"] = depth
+            if abs(value) >= WIN - self.size:
+                break
+        return best
+
+    def search_root(self, me, opp, depth, first):
+        alpha, beta = -WIN - 1, WIN + 1
+        best_value, best_move = None, first
+        moves = self.candidates(me, opp, 0, first)
+        for c in moves:
+            value = -self.negamax(opp, me | 1 << c, c, depth - 1, -beta, -alpha, 1)
+            if best_value is None or value > best_value:
+                best_value, best_move = value, c
+                alpha = max(alpha, value)
+        return best_value, best_move
+
+    def negamax(self, me, opp, last, depth, alpha, beta, ply):
+        """
+        Value of the position for ME, the side to move, where OPP has
+        just played cell LAST.
+        """
+        stats = self.stats
+        stats["nodes"] += 1
+        if stats["nodes"] % CLOCK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise _Timeout()
+
+        if any(opp & line == line for line in self.lines_through[last]):
+            return -(WIN - ply)
+        if me | opp == self.full:
+            return 0
+        if depth == 0:
+            return self.evaluate(me, opp)
+
+        key = (me, opp)
+        entry = self.table.get(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, value, flag, tt_move = entry
+            if entry_depth >= depth and (
+                    flag == EXACT
+                    or (flag == LOWER and value >= beta)
+                    or (flag == UPPER and value <= alpha)):
+                stats["tt_hits"] += 1
+                return value
+        alpha_in = alpha
+
+        best_value, best_move = -WIN - 1, None
+        for c in self.candidates(me, opp, ply, tt_move):
+            value = -self.negamax(opp, me | 1 << c, c, depth - 1, -beta, -alpha, ply + 1)
+            if value > best_value:
+                best_value, best_move = value, c
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        stats["cutoffs"] += 1
+                        killers = self.killers[ply]
+                        if c not in killers:
+                            killers.insert(0, c)
+                            del killers[2:]
+                        self.history[c] += depth * depth
+                        break
+
+        if best_value <= alpha_in:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, best_value, flag, best_move)
+        return best_value
+
+    def candidates(self, me, opp, ply, first=None):
+        """
+        Empty cells worth trying, best guesses first: FIRST (the table
+        move), the killer moves at PLY, then by history and centrality.
+        On an empty board only the centre is tried.
+        """
+        occupied = me | opp
+        if not occupied:
+            return [self.by_centre[0]]
+        near = 0
+        stones = occupied
+        while stones:
+            low = stones & -stones
+            near |= self.near[low.bit_length() - 1]
+            stones ^= low
+        free = near & ~occupied
+
+        cells = []
+        while free:
+            low = free & -free
+            cells.append(low.bit_length() - 1)
+            free ^= low
+        history, rank = self.history, self.centre_rank
+        cells.sort(key=lambda c: (-history[c], rank[c]))
+        for c in reversed(self.killers[ply]):
+            if c in cells:
+                cells.remove(c)
+                cells.insert(0, c)
+        if first is not None and first in cells:
+            cells.remove(first)
+            cells.insert(0, first)
+        return cells
+
+    def evaluate(self, me, opp):
+        """
+        Heuristic value for ME: every window holding only one side's
+        stones counts 4 ** stones for that side.
+        """
+        weights = self.weights
+        occupied = me | opp
+        score = 0
+        for line in self.lines:
+            if line & occupied:
+                mine = line & me
+                theirs = line & opp
+                if not theirs:
+                    score += weights[mine.bit_count()]
+                elif not mine:
+                    score -= weights[theirs.bit_count()]
+        return score
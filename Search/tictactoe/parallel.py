@@ -0,0 +1,236 @@
+"""
+Parallel search: the moves at the root of one position, or a batch of
+positions, spread over a process pool.
+
+Root split: every root move is searched by a worker. Workers share the
+best value found so far (a multiprocessing.Value) and search each move
+only for values above it, so a strong early move prunes the others. A
+move whose search fails at or below that bound is at most as good as
+the move which set it, so the answer is the best move whose value was
+searched exactly. Which of several equally good moves is returned can
+depend on timing; with one worker the moves are searched in order in
+this process and the answer is deterministic.
+
+The game is tictactoe.py (searched to the end) or an mnk.MNKGame
+(searched to a fixed depth).
+
+    python parallel.py [workers] [rows cols k depth]
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import tictactoe as ttt
+from mnk import MNKGame, WIN
+
+# the worker's game and the shared best value of the current root search
+_game = None
+_best = None
+
+
+def game_spec(game):
+    """
+    A picklable stand-in for GAME, for workers that are spawned rather
+    than forked: None for tic-tac-toe, else the MNKGame's (m, n, k).
+    """
+    return None if game is ttt else (game.m, game.n, game.k)
+
+
+def make_game(spec):
+    """ The game that game_spec returned SPEC for. """
+    return ttt if spec is None else MNKGame(*spec)
+
+
+def value_range(game):
+    """ the lowest and highest values a search of GAME can return """
+    if isinstance(game, MNKGame):
+        return -WIN - 1, WIN + 1
+    return -1, 1
+
+
+def root_moves(game, board):
+    if isinstance(game, MNKGame):
+        return game.root_moves(board)
+    return sorted(ttt.actions(board))
+
+
+def move_value(game, board, action, depth, bound):
+    """
+    Value of ACTION for the side to move on BOARD, searched only for
+    values above BOUND: a value at or below BOUND means "no better".
+    """
+    if bound >= value_range(game)[1]:
+        # nothing can beat it, and an empty window is no search
+        return bound
+    if isinstance(game, MNKGame):
+        return game.move_value(board, action, depth, alpha=bound)
+    child = ttt.result(board, action, validate=False)
+    if ttt.player(board) == ttt.X:
+        return ttt.value_and_action(child, bound, 1)[0]
+    return -ttt.value_and_action(child, -1, -bound)[0]
+
+
+def analyse(game, board, depth=None):
+    """
+    Returns (value for the side to move, best action) of BOARD,
+    searching its root moves one after another.
+    """
+    low, _ = value_range(game)
+    best_value, best_action = low, None
+    for action in root_moves(game, board):
+        value = move_value(game, board, action, depth, best_value)
+        if best_action is None or value > best_value:
+            best_value, best_action = value, action
+    return best_value, best_action
+
+
+def init_worker(spec, best):
+    global _game, _best
+    _game, _best = make_game(spec), best
+
+
+def search_move(board, action, depth):
+    """
+    Worker side of the root split: search ACTION above the shared best
+    value and publish the result. Returns (value, exact).
+    """
+    bound = _best.value
+    value = move_value(_game, board, action, depth, bound)
+    with _best.get_lock():
+        if value > _best.value:
+            _best.value = value
+    return value, value > bound or bound == value_range(_game)[0]
+
+
+def analyse_worker(board, depth):
+    return analyse(_game, board, depth)
+
+
+class ParallelSearch():
+    """
+    A process pool searching GAME (the tictactoe module by default).
+    With WORKERS == 1 everything runs serially in this process.
+    """
+
+    def __init__(self, workers=None, game=ttt):
+        self.workers = workers or os.cpu_count()
+        self.game = game
+        self.executor = None
+
+    def pool(self):
+        if self.executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else None)
+            self.best = context.Value("q", 0)
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                initializer=init_worker,
+                                                initargs=(game_spec(self.game), self.best))
+        return self.executor
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def analyse(self, board, depth=None):
+        """
+        Returns (value for the side to move, best action) of BOARD, with
+        its root moves searched in parallel. DEPTH is required for an
+        MNKGame and ignored for tic-tac-toe.
+        """
+        if ttt.terminal(board) if self.game is ttt else self.game.terminal(board):
+            raise ValueError("the game is over on this board")
+        moves = root_moves(self.game, board)
+        if self.workers == 1 or len(moves) == 1:
+            return analyse(self.game, board, depth)
+
+        executor = self.pool()
+        low, _ = value_range(self.game)
+        self.best.value = low
+        futures = [executor.submit(search_move, board, action, depth) for action in moves]
+        best_value, best_action = None, None
+        for action, future in zip(moves, futures):
+            value, exact = future.result()
+            if exact and (best_action is None or value > best_value):
+                best_value, best_action = value, action
+        return best_value, best_action
+
+    def minimax(self, board, depth=None):
+        """ The best action for the side to move on BOARD. """
+        return self.analyse(board, depth)[1]
+
+    def analyse_many(self, boards, depth=None):
+        """
+        Returns [(value for the side to move, best action)] for a batch
+        of BOARDS, each searched serially by one worker.
+        """
+        if self.workers == 1 or len(boards) <= 1:
+            return [analyse(self.game, board, depth) for board in boards]
+        chunksize = max(1, len(boards) // (4 * self.workers))
+        return list(self.pool().map(analyse_worker, boards,
+                                    [depth] * len(boards), chunksize=chunksize))
+
+
+def bench_workers(game, boards, depth, max_workers):
+    """
+    Returns [(workers, root split seconds, batch seconds)]: the time to
+    analyse BOARDS one by one with the root split, and all at once as a
+    batch, for 1 .. MAX_WORKERS workers. Each run starts from cold
+    tables.
+    """
+    rows = []
+    for workers in range(1, max_workers + 1):
+        times = []
+        for batch in (False, True):
+            ttt.clear_transposition_table()
+            if isinstance(game, MNKGame):
+                game.table.clear()
+            with ParallelSearch(workers, game) as search:
+                if workers > 1:
+                    search.pool().submit(int).result()  # start the pool untimed
+                start = time.perf_counter()
+                if batch:
+                    search.analyse_many(boards, depth)
+                else:
+                    for board in boards:
+                        search.analyse(board, depth)
+                times.append(time.perf_counter() - start)
+        rows.append((workers, *times))
+    return rows
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) not in (0, 1, 5):
+        sys.exit("Usage: python parallel.py [workers] [rows cols k depth]")
+    max_workers = int(args[0]) if args else os.cpu_count()
+    if len(args) == 5:
+        m, n, k, depth = map(int, args[1:])
+        game = MNKGame(m, n, k)
+    else:
+        game, depth = MNKGame(4, 4, 4), 7
+    # the empty board and every position after one move
+    board = game.initial_state()
+    boards = [board] + [game.result(board, (i, j))
+                        for i in range(game.m) for j in range(game.n)]
+
+    print(f"{game.m}x{game.n}, {game.k} in a row, depth {depth}, {len(boards)} positions")
+    print(f"{'workers':>7} {'root split':>11} {'speedup':>8} {'batch':>9} {'speedup':>8}")
+    rows = bench_workers(game, boards, depth, max_workers)
+    _, split_1, batch_1 = rows[0]
+    for workers, split, batch in rows:
+        print(f"{workers:>7} {split:>10.2f}s {split_1 / split:>7.2f}x "
+              f"{batch:>8.2f}s {batch_1 / batch:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,16 @@ import sys
 import time
 
 import tictactoe as ttt
+from mnk import MNKGame
+
+# python runner.py [rows cols k [seconds per move]]
+if len(sys.argv) not in (1, 4, 5):
+    sys.exit("Usage: python runner.py [rows cols k [seconds per move]]")
+if len(sys.argv) == 1:
+    game = ttt
+else:
+    game = MNKGame(*map(int, sys.argv[1:4]),
+                   time_budget=float(sys.argv[4]) if len(sys.argv) == 5 else 1.0)
 
 pygame.init()
 size = width, height = 600, 400
@@ -15,10 +25,14 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+board = game.initial_state()
+rows, cols = len(board), len(board[0])
+
+# Fit the board between the title and the button
+tile_size = min(80, (height - 130) // rows, (width - 40) // cols)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
 ai_turn = False
 
 while True:
@@ -33,7 +47,8 @@ while True:
     if user is None:
 
         # Draw title
-        title = largeFont.render("Play Tic-Tac-Toe", True, white)
+        name = "Tic-Tac-Toe" if game is ttt else f"{game.k} in a Row"
+        title = largeFont.render(f"Play {name}", True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 50)
         screen.blit(title, titleRect)
@@ -59,21 +74,20 @@ while True:
             mouse = pygame.mouse.get_pos()
             if playXButton.collidepoint(mouse):
                 time.sleep(0.2)
-                user = ttt.X
+                user = game.X
             elif playOButton.collidepoint(mouse):
                 time.sleep(0.2)
-                user = ttt.O
+                user = game.O
 
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (cols / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(cols):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -81,7 +95,7 @@ while True:
                 )
                 pygame.draw.rect(screen, white, rect, 3)
 
-                if board[i][j] != ttt.EMPTY:
+                if board[i][j] != game.EMPTY:
                     move = moveFont.render(board[i][j], True, white)
                     moveRect = move.get_rect()
                     moveRect.center = rect.center
@@ -89,12 +103,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = game.terminal(board)
+        player = game.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = game.winner(board)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -112,8 +126,8 @@ while True:
         if user != player and not game_over:
             if ai_turn:
                 time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
+                move = game.minimax(board)
+                board = game.result(board, move)
                 ai_turn = False
             else:
                 ai_turn = True
@@ -122,10 +136,10 @@ while True:
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
+            for i in range(rows):
+                for j in range(cols):
+                    if (board[i][j] == game.EMPTY and tiles[i][j].collidepoint(mouse)):
+                        board = game.result(board, (i, j))
 
         if game_over:
             againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
@@ -140,7 +154,7 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
+                    board = game.initial_state()
                     ai_turn = False
 
     pygame.display.flip()
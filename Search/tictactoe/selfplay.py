@@ -0,0 +1,227 @@
+"""
+Headless self-play and position evaluation, for measuring the engine
+without runner.py.
+
+    python selfplay.py games [--games N] [--opponent ai|random] [options]
+    python selfplay.py evaluate FILE [--output FILE] [options]
+
+Games are AI against AI, or AI against a random mover with the AI
+taking X in half the games and O in the other half. Positions files hold
+one board per line, rows separated by "/" and empty cells as ".", e.g.
+"X.O/.X./..O"; blank lines and lines starting with "#" are skipped.
+
+Both commands spread their work over a process pool and print a JSON
+summary: moves per second, AI move latency percentiles and, for games,
+win/draw rates. Options:
+
+    --workers N        processes (default: all cores; 1 runs in process)
+    --size M N K       play an mnk.MNKGame instead of tictactoe.py
+    --budget SECONDS   MNKGame time per move (default 0.1)
+    --no-book          search every tictactoe move instead of using the book
+    --seed S           seed for the random mover
+    --stats FILE       append a JSON line of search counters per AI move
+                       (see instrument.py)
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import instrument
+import tictactoe as ttt
+from mnk import MNKGame
+
+# the worker's game and move function, set by init_worker
+_game = None
+_choose = None
+
+
+def make_engine(size=None, budget=0.1, use_book=True):
+    """
+    Returns (game, choose): the rules (tictactoe.py or an MNKGame) and
+    the AI's move function for a board.
+    """
+    if size is None:
+        return ttt, lambda board: ttt.minimax(board, use_book=use_book)
+    game = MNKGame(*size, time_budget=budget)
+    return game, game.minimax
+
+
+def init_worker(size, budget, use_book):
+    global _game, _choose
+    _game, _choose = make_engine(size, budget, use_book)
+
+
+def parse_board(line):
+    """ The list-of-lists board for a line like "X.O/.X./..O". """
+    rows = line.strip().split("/")
+    if len({len(row) for row in rows}) != 1 or set("".join(rows)) - set("XO."):
+        raise ValueError(f"not a board: {line.strip()!r}")
+    return [[None if cell == "." else cell for cell in row] for row in rows]
+
+
+def format_board(board):
+    return "/".join("".join(cell or "." for cell in row) for row in board)
+
+
+def read_positions(path):
+    with open(path, encoding="utf-8") as f:
+        return [parse_board(line) for line in f
+                if line.strip() and not line.startswith("#")]
+
+
+def play_game(opponent, ai_side, seed):
+    """
+    Play one game from the empty board. OPPONENT is "ai" or "random";
+    against random, the AI plays AI_SIDE. Returns (winner, AI move
+    latencies in seconds, plies).
+    """
+    rng = random.Random(seed)
+    board = _game.initial_state()
+    latencies = []
+    plies = 0
+    while not _game.terminal(board):
+        side = _game.player(board)
+        if opponent == "ai" or side == ai_side:
+            start = time.perf_counter()
+            action = _choose(board)
+            latencies.append(time.perf_counter() - start)
+        else:
+            action = rng.choice(sorted(_game.actions(board)))
+        board = _game.result(board, action)
+        plies += 1
+    return _game.winner(board), latencies, plies
+
+
+def evaluate_position(board):
+    """ Returns (best action or None if the game is over, seconds taken). """
+    if _game.terminal(board):
+        return None, 0.0
+    start = time.perf_counter()
+    action = _choose(board)
+    return action, time.perf_counter() - start
+
+
+def run_tasks(function, tasks, workers, engine):
+    """
+    Yields FUNCTION(*task) for each of TASKS, in order, over a pool of
+    WORKERS processes, or in this process when WORKERS == 1.
+    """
+    if workers == 1 or len(tasks) <= 1:
+        init_worker(*engine)
+        for task in tasks:
+            yield function(*task)
+        return
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=engine) as executor:
+        yield from executor.map(function, *zip(*tasks), chunksize=chunksize)
+
+
+def latency_summary(seconds):
+    """ mean/p50/p90/p99/max in milliseconds for a list of durations """
+    if not seconds:
+        return {}
+    ms = sorted(1000 * s for s in seconds)
+    return {
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": ms[(len(ms) - 1) // 2],
+        "p90_ms": ms[int(0.90 * (len(ms) - 1))],
+        "p99_ms": ms[int(0.99 * (len(ms) - 1))],
+        "max_ms": ms[-1]
+    }
+
+
+def self_play(games, opponent="ai", workers=None, engine=(None, 0.1, True), seed=0):
+    """ Play GAMES games and return the summary record. """
+    tasks = [(opponent, ttt.X if n % 2 == 0 else ttt.O, seed + n) for n in range(games)]
+    start = time.perf_counter()
+    results = list(run_tasks(play_game, tasks, workers, engine))
+    elapsed = time.perf_counter() - start
+
+    latencies = [s for _, game_latencies, _ in results for s in game_latencies]
+    plies = sum(p for _, _, p in results)
+    record = {
+        "command": "games",
+        "opponent": opponent,
+        "games": games,
+        "seconds": elapsed,
+        "games_per_sec": games / elapsed,
+        "positions_per_sec": plies / elapsed,
+        "ai_moves": len(latencies),
+        "latency": latency_summary(latencies),
+    }
+    winners = [winner for winner, _, _ in results]
+    if opponent == "ai":
+        record["x_wins"] = winners.count(ttt.X) / games
+        record["o_wins"] = winners.count(ttt.O) / games
+    else:
+        sides = [ai_side for _, ai_side, _ in tasks]
+        record["ai_wins"] = sum(w == s for w, s in zip(winners, sides)) / games
+        record["ai_losses"] = sum(w not in (s, None) for w, s in zip(winners, sides)) / games
+    record["draws"] = winners.count(None) / games
+    return record
+
+
+def evaluate(boards, workers=None, engine=(None, 0.1, True)):
+    """ Returns (summary record, [best action per board]). """
+    start = time.perf_counter()
+    results = list(run_tasks(evaluate_position, [(board,) for board in boards],
+                             workers, engine))
+    elapsed = time.perf_counter() - start
+    record = {
+        "command": "evaluate",
+        "positions": len(boards),
+        "seconds": elapsed,
+        "positions_per_sec": len(boards) / elapsed if elapsed else 0.0,
+        "latency": latency_summary([s for action, s in results if action is not None]),
+    }
+    return record, [action for action, _ in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="headless tic-tac-toe self-play")
+    commands = parser.add_subparsers(dest="command", required=True)
+    games = commands.add_parser("games", help="play AI games")
+    games.add_argument("--games", type=int, default=1000)
+    games.add_argument("--opponent", choices=["ai", "random"], default="ai")
+    games.add_argument("--seed", type=int, default=0)
+    positions = commands.add_parser("evaluate", help="evaluate a positions file")
+    positions.add_argument("positions", help="file of boards like X.O/.X./..O")
+    positions.add_argument("--output", help="JSONL file of the chosen moves")
+    for command in (games, positions):
+        command.add_argument("--workers", type=int, default=os.cpu_count())
+        command.add_argument("--size", type=int, nargs=3, metavar=("M", "N", "K"))
+        command.add_argument("--budget", type=float, default=0.1)
+        command.add_argument("--no-book", dest="book", action="store_false")
+        command.add_argument("--stats", metavar="FILE")
+    args = parser.parse_args()
+
+    # forked workers inherit the open stats file
+    if args.stats:
+        instrument.enable(args.stats)
+
+    engine = (args.size, args.budget, args.book)
+    if args.command == "games":
+        record = self_play(args.games, args.opponent, args.workers, engine, args.seed)
+    else:
+        boards = read_positions(args.positions)
+        record, moves = evaluate(boards, args.workers, engine)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                for board, move in zip(boards, moves):
+                    f.write(json.dumps({"board": format_board(board), "move": move}) + "\n")
+    json.dump(record, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
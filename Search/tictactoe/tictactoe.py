@@ -3,14 +3,20 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
-from ucb import trace
 import operator
+import time
+
+import book
+import instrument
+from bitboard import Bitboard, SYMMETRIES, canonical_key
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# (i, j) -> bit index of that cell on a Bitboard
+CELLS = {(i, j): 3 * i + j for i in range(3) for j in range(3)}
+
 
 def initial_state():
     """
@@ -21,7 +27,6 @@ def initial_state():
             [EMPTY, EMPTY, EMPTY]]
 
 
-# @trace
 def player(board):
     """
     Returns player who has the next turn on a board.
@@ -33,38 +38,28 @@ def player(board):
     >>> player(board)
     'O'
     """
-
-    if terminal(board):
+    position = Bitboard.from_board(board)
+    if position.terminal():
         return None
-
-    # count the num of Xs and Os
-    num_X, num_O = 0, 0
-    for row in board:
-        for cell in row:
-            if cell == "X": num_X += 1
-            elif cell == "O": num_O += 1
-    if num_X == num_O: return X
-    else: return O
+    return position.turn()
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-
-    if terminal(board):
+    position = Bitboard.from_board(board)
+    if position.terminal():
         return None
     # return the place where the cell is empty
-    coordinates = set()
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY: coordinates.add((i, j))
-    return coordinates
+    return {(i // 3, i % 3) for i in position.moves()}
 
 
-def result(board, action):
+def result(board, action, validate=True):
     """
     Returns the board that results from making move (i, j) on the board.
+    VALIDATE=False skips the legality check, for callers passing a move
+    taken from actions(board).
     >>> board = [[EMPTY, EMPTY, EMPTY],[EMPTY, EMPTY, EMPTY],[EMPTY, EMPTY, EMPTY]]
     >>> newb = result(board, (0, 0))
     >>> newb
@@ -72,54 +67,28 @@ def result(board, action):
     >>> result(newb, (0, 1))
     [['X', 'O', None], [None, None, None], [None, None, None]]
     """
-    turn = player(board)
-    valid_actions = actions(board)
-    new_board = copy.deepcopy(board)
-
-    # check action validity
-    if action not in valid_actions:
-        raise Exception("invalid action")
-    # get coordinates
-    i, j = action[0], action[1] 
-
-    if turn == X:
-        new_board[i][j] = X
+    if validate:
+        position = Bitboard.from_board(board)
+        # check action validity
+        if (position.terminal() or action not in CELLS
+                or CELLS[action] not in position.moves()):
+            raise Exception("invalid action")
+        turn = position.turn()
     else:
-        new_board[i][j] = O
+        xs = sum(row.count(X) for row in board)
+        turn = X if xs == sum(row.count(O) for row in board) else O
+    i, j = action
+    new_board = [row[:] for row in board]
+    new_board[i][j] = turn
     return new_board
-    
 
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    who_wins = None
-    def check_win_condition(pos1, pos2, pos3):
-        # if three are the same, rebind winner, return ture
-        nonlocal who_wins
-        cell_pos1 = board[pos1[0]][pos1[1]]
-        cell_pos2 = board[pos2[0]][pos2[1]]
-        cell_pos3 = board[pos3[0]][pos3[1]]
-        if not all([cell_pos1, cell_pos2, cell_pos3]):
-            return None
-        elif cell_pos1 == cell_pos2 == cell_pos3:
-            who_wins = cell_pos1
-            return True
-    check_pos = []
-    # add row checking
-    for row in range(3):
-        check_pos.append(((row, 0), (row, 1), (row, 2)))
-    # add col checking
-    for col in range(3):
-        check_pos.append(((0, col), (1, col), (2, col)))
-    # add diagonal checking
-    check_pos.append(((0, 0), (1, 1), (2, 2)))
-    check_pos.append(((0, 2), (1, 1), (2, 0)))
-    for args in check_pos:
-        if check_win_condition(*args) == True:
-            return who_wins
-    return None
+    return Bitboard.from_board(board).winner()
+
 
 def terminal(board):
     """
@@ -129,35 +98,53 @@ def terminal(board):
     >>> terminal(board)
     True
     """
-    def has_any_space(board):
-        for row in board:
-            for cell in row:
-                if cell is EMPTY: return True
-        return False
-
-    # print(f"DEBUG: winner = {winner(board)}")
-    if winner(board) is not None:
-        return True
-    elif not has_any_space(board): # this is tie
-        return True
-    else:
-        return False
+    return Bitboard.from_board(board).terminal()
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    assert terminal(board), "the board is not terminated, it has no utility"
-    who_wins = winner(board)
-    if who_wins == X: return 1
-    elif who_wins == O: return -1
-    else: return 0
+    position = Bitboard.from_board(board)
+    assert position.terminal(), "the board is not terminated, it has no utility"
+    return position.utility()
+
+# Transposition table bound flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# canonical_key of a position -> (value, bound flag, best move index in that key)
+# kept for the whole session, so later calls reuse earlier searches
+transposition_table = {}
+
+# value_and_action's play for each side
+strategy = {"X": {"init_value": -1,
+                  "compare_func": operator.gt},
+            "O": {"init_value": 1,
+                  "compare_func": operator.lt}}
+
+# Cells in the order they are tried: centre, corners, then edges
+ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# killers[ply]: up to two moves that last caused a cutoff at that ply
+killers = [[] for _ in range(10)]
+
+# counters of the last minimax call: positions visited, table answers,
+# cutoffs and positions visited per ply
+stats = {"nodes": 0, "tt_hits": 0, "cutoffs": 0, "depths": [0] * 10}
+
+
+def clear_transposition_table():
+    transposition_table.clear()
+
 
-def minimax(board):
+def minimax(board, use_book=True, pvs=False):
     """
     Returns the optimal action for the current player on the board.
 
+    Reachable positions are answered from the precomputed opening book;
+    with USE_BOOK false, or for positions outside it, the board is
+    searched, by principal variation search if PVS is true.
+
     >>> board = initial_state()
     >>> board = result(board, (0, 0))
     >>> board = result(board, (1, 1))
@@ -165,43 +152,131 @@ def minimax(board):
     >>> minimax(board)
     (0, 2)
     """
-    strategy = {"X": {"init_value": -1,
-                        "compare_func": operator.gt},
-                "O": {"init_value": 1,
-                        "compare_func": operator.lt}}
-    def value_and_action(board, alpha, beta):
-        """
-        ALPHA is the best value max player (X) can have currently
-        BETA is the best value min player (O) can have currently
-        use ALPHA and BETA to determine whether or not to explore
-        a branch
-        when in X's turn, we calculate BETA to determine ALPHA
-        """
-        # if the game has terminated
-        if terminal(board):
-            return utility(board), None
-
-        whos_turn = player(board)
-        valid_actions = actions(board)
-        value = strategy[whos_turn]["init_value"]
-        compare_func = strategy[whos_turn]["compare_func"]
-        optimal_action = None
-
-        # simulating games
-        for action in valid_actions:
-            new_board = result(board, action)
-            new_value = value_and_action(new_board, alpha, beta)[0]
-            # updating optimal value and action
-            if compare_func(new_value, value):
-                value, optimal_action = new_value, action
-                # update alpha, beta
-                if whos_turn == "X":
-                    alpha = value
-                else:
-                    beta = value
-            # pruning
-            if beta < alpha:
-                break
-        return value, optimal_action
-    return value_and_action(board, -1, 1)[1]
+    if not instrument.enabled:
+        return choose(board, use_book, pvs)
+    start = time.perf_counter()
+    move = choose(board, use_book, pvs)
+    instrument.record("tictactoe", stats, time.perf_counter() - start,
+                      book=stats["nodes"] == 0, pvs=pvs)
+    return move
+
+
+def choose(board, use_book, pvs):
+    """ minimax without the instrumentation """
+    stats["nodes"] = stats["tt_hits"] = stats["cutoffs"] = 0
+    stats["depths"] = [0] * 10
+    if use_book:
+        move = book.best_move(board)
+        if move is not None:
+            return move
+    for moves in killers:
+        moves.clear()
+    return value_and_action(board, -1, 1, pvs)[1]
 
+
+def value_and_action(board, alpha, beta, pvs=False):
+    """
+    Returns (value, action) of BOARD searched with the window
+    ALPHA..BETA, where ALPHA < BETA; see search.
+    """
+    value, i = search(Bitboard.from_board(board), alpha, beta, 0, pvs)
+    return value, None if i is None else (i // 3, i % 3)
+
+
+def search(position, alpha, beta, ply=0, pvs=False):
+    """
+    ALPHA is the best value max player (X) can have currently
+    BETA is the best value min player (O) can have currently
+    use ALPHA and BETA to determine whether or not to explore
+    a branch
+    when in X's turn, we calculate BETA to determine ALPHA
+
+    POSITION is a Bitboard, played on and taken back in place, so the
+    search allocates no boards. Returns (value, best move index).
+
+    Moves are tried best guess first: the table's move, the killer
+    moves at PLY, then centre, corners and edges. With PVS, the moves
+    after the first are only tested against a null window, and searched
+    in full when they beat it.
+    """
+    stats["nodes"] += 1
+    stats["depths"][ply] += 1
+    # if the game has terminated
+    if position.terminal():
+        return position.utility(), None
+
+    # positions reached by another move order, or symmetric to one
+    # already searched, are answered from the table
+    key, t = canonical_key(position.x, position.o)
+    entry = transposition_table.get(key)
+    tt_move = None
+    if entry is not None:
+        value, flag, move = entry
+        tt_move = SYMMETRIES[t].index(move)
+        if (flag == EXACT
+                or (flag == LOWER and value >= beta)
+                or (flag == UPPER and value <= alpha)):
+            stats["tt_hits"] += 1
+            return value, tt_move
+    alpha_in, beta_in = alpha, beta
+
+    whos_turn = position.turn()
+    occupied = position.x | position.o
+    moves = [i for i in ORDER if not occupied >> i & 1]
+    for i in reversed(killers[ply]):
+        if i in moves:
+            moves.remove(i)
+            moves.insert(0, i)
+    if tt_move is not None:
+        moves.remove(tt_move)
+        moves.insert(0, tt_move)
+    value = strategy[whos_turn]["init_value"]
+    compare_func = strategy[whos_turn]["compare_func"]
+    # start from any move, so a lost position still returns one
+    optimal_move = moves[0]
+
+    # simulating games
+    for n, i in enumerate(moves):
+        position.play(i)
+        if not pvs or n == 0:
+            new_value = search(position, alpha, beta, ply + 1, pvs)[0]
+        elif whos_turn == "X":
+            # can it beat alpha?
+            new_value = search(position, alpha, alpha + 1, ply + 1, pvs)[0]
+            if alpha < new_value < beta:
+                new_value = search(position, new_value, beta, ply + 1, pvs)[0]
+        else:
+            # can it get below beta?
+            new_value = search(position, beta - 1, beta, ply + 1, pvs)[0]
+            if alpha < new_value < beta:
+                new_value = search(position, alpha, new_value, ply + 1, pvs)[0]
+        position.undo(i)
+        # updating optimal value and action
+        if compare_func(new_value, value):
+            value, optimal_move = new_value, i
+        # update alpha, beta, and prune once this side has a move the
+        # other will never allow
+        if whos_turn == "X":
+            alpha = max(alpha, value)
+            cutoff = value >= beta
+        else:
+            beta = min(beta, value)
+            cutoff = value <= alpha
+        if cutoff:
+            stats["cutoffs"] += 1
+            if i not in killers[ply]:
+                killers[ply].insert(0, i)
+                del killers[ply][2:]
+            break
+
+    # a cut-off value, or one on the window's edge, is only a bound
+    if cutoff:
+        flag = LOWER if whos_turn == "X" else UPPER
+    elif value <= alpha_in:
+        flag = UPPER
+    elif value >= beta_in:
+        flag = LOWER
+    else:
+        flag = EXACT
+    transposition_table[key] = (value, flag, SYMMETRIES[t][optimal_move])
+    return value, optimal_move
@@ -1,7 +1,192 @@
 import doctest
+import functools
 from tictactoe import *  # Replace with your module and function name
 
 # doctest.run_docstring_examples(player, globals(), verbose=False)
 # doctest.run_docstring_examples(result, globals(), verbose=False)
 # doctest.run_docstring_examples(terminal, globals(), verbose=False)
-doctest.run_docstring_examples(minimax, globals(), verbose=False)
\ No newline at end of file
+doctest.run_docstring_examples(minimax, globals(), verbose=False)
+
+
+def game_value(board):
+    """ exact value of BOARD by plain, unpruned minimax """
+    return position_value(tuple(map(tuple, board)))
+
+
+@functools.lru_cache(maxsize=None)
+def position_value(position):
+    """ game_value of a board given as a tuple of row tuples """
+    board = [list(row) for row in position]
+    if terminal(board):
+        return utility(board)
+    values = [game_value(result(board, a)) for a in actions(board)]
+    return max(values) if player(board) == X else min(values)
+
+
+def reachable_positions():
+    """ every non-terminal position reachable from the empty board """
+    seen, stack = {}, [initial_state()]
+    while stack:
+        board = stack.pop()
+        if str(board) in seen or terminal(board):
+            continue
+        seen[str(board)] = board
+        stack.extend(result(board, a) for a in actions(board))
+    return list(seen.values())
+
+
+def test_minimax_optimal_everywhere():
+    """minimax keeps the game value from every reachable position"""
+    clear_transposition_table()
+    for board in reachable_positions():
+        for move in (minimax(board), minimax(board, use_book=False)):
+            assert move in actions(board)
+            assert game_value(result(board, move)) == game_value(board)
+
+
+def test_transposition_table_persists():
+    """a repeated question is answered from the table"""
+    clear_transposition_table()
+    minimax(initial_state(), use_book=False)
+    assert stats["nodes"] > 1
+    minimax(initial_state(), use_book=False)
+    assert stats["nodes"] == 1 and stats["tt_hits"] == 1
+
+
+def test_bitboard_adapter_matches_legacy():
+    """the bitboard-backed API answers like the original list code"""
+    import benchmark
+    from bitboard import Bitboard
+    boards = reachable_positions()
+    boards += [result(b, a) for b in boards for a in actions(b)]
+    for board in boards:
+        assert player(board) == benchmark.legacy_player(board)
+        assert actions(board) == benchmark.legacy_actions(board)
+        assert winner(board) == benchmark.legacy_winner(board)
+        assert terminal(board) == benchmark.legacy_terminal(board)
+        assert Bitboard.from_board(board).to_board() == board
+
+
+def test_book_matches_search():
+    """the shipped book agrees with a fresh solve and the plain search"""
+    import book
+    assert book.load() == book.solve()
+    for board in reachable_positions():
+        value, move = book.lookup(board)
+        assert value == game_value(board)
+        assert game_value(result(board, move)) == value
+
+
+def test_mnk_engine():
+    """the m,n,k engine plays 3x3 perfectly and big boards on time"""
+    import time
+    from mnk import MNKGame
+    game = MNKGame(3, 3, 3, time_budget=10)
+    for board in reachable_positions():
+        move = game.minimax(board)
+        assert game_value(result(board, move)) == game_value(board)
+
+    gomoku = MNKGame(15, 15, 5, time_budget=0.2)
+    board = gomoku.initial_state()
+    for move in [(7, 3), (0, 0), (7, 4), (0, 14), (7, 5), (14, 0), (7, 6)]:
+        board = gomoku.result(board, move)
+    # O must block the open four
+    assert gomoku.minimax(board) in {(7, 2), (7, 7)}
+    board = gomoku.result(board, (14, 14))
+    start = time.perf_counter()
+    assert gomoku.minimax(board) in {(7, 2), (7, 7)}
+    assert time.perf_counter() - start < 0.5
+
+
+def test_parallel_search_matches_serial():
+    """root split and batch answers agree with the serial search"""
+    import parallel
+    from mnk import MNKGame
+    boards = reachable_positions()[:200]
+    game = MNKGame(4, 4, 3)
+    opening = [game.result(game.initial_state(), (i, j)) for i in range(4) for j in range(4)]
+    with parallel.ParallelSearch(2) as search, parallel.ParallelSearch(2, game) as mnk:
+        for board in boards:
+            value, move = search.analyse(board)
+            sign = 1 if player(board) == X else -1
+            assert value * sign == game_value(board)
+            assert game_value(result(board, move)) == game_value(board)
+        for board, (value, move) in zip(boards, search.analyse_many(boards)):
+            assert value == parallel.analyse(parallel.ttt, board)[0]
+            assert game_value(result(board, move)) == game_value(board)
+        for board in opening:
+            serial = parallel.analyse(game, board, 4)
+            assert mnk.analyse(board, 4)[0] == serial[0]
+
+
+def test_parallel_search_spawned_workers(monkeypatch):
+    """the pool also works where workers are spawned instead of forked"""
+    import multiprocessing
+    import parallel
+    from mnk import MNKGame
+    get_context = multiprocessing.get_context
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    monkeypatch.setattr(multiprocessing, "get_context",
+                        lambda method=None: get_context(method or "spawn"))
+    board = initial_state()
+    game = MNKGame(3, 3, 3)
+    with parallel.ParallelSearch(2) as search, parallel.ParallelSearch(2, game) as mnk:
+        value, move = search.analyse(board)
+        assert value == 0 and game_value(result(board, move)) == 0
+        assert search.analyse_many([board, result(board, (1, 1))])[0][0] == 0
+        assert mnk.analyse(board, 9)[0] == 0
+
+
+def test_move_ordering_and_pvs():
+    """ordered alpha-beta and PVS stay optimal and beat the legacy node count"""
+    import benchmark
+    for pvs in (False, True):
+        clear_transposition_table()
+        for board in reachable_positions():
+            move = minimax(board, use_book=False, pvs=pvs)
+            assert game_value(result(board, move)) == game_value(board)
+    legacy = {"nodes": 0}
+    benchmark.legacy_minimax(initial_state(), legacy)
+    for pvs in (False, True):
+        clear_transposition_table()
+        minimax(initial_state(), use_book=False, pvs=pvs)
+        assert stats["nodes"] * 50 < legacy["nodes"]
+
+
+def test_selfplay_harness():
+    """perfect play draws itself and never loses to a random mover"""
+    import selfplay
+    record = selfplay.self_play(20, "ai", workers=1)
+    assert record["draws"] == 1.0 and record["ai_moves"] == 180
+    record = selfplay.self_play(50, "random", workers=2, engine=(None, 0.1, False))
+    assert record["ai_losses"] == 0.0
+    assert record["ai_wins"] + record["draws"] == 1.0
+
+    boards = reachable_positions()[:50]
+    assert [selfplay.parse_board(selfplay.format_board(b)) for b in boards] == boards
+    record, moves = selfplay.evaluate(boards, workers=1)
+    assert record["positions"] == 50
+    for board, move in zip(boards, moves):
+        assert game_value(result(board, move)) == game_value(board)
+
+
+def test_instrumentation_records_moves():
+    """enabled instrumentation records one structured entry per move"""
+    import instrument
+    instrument.enable()
+    try:
+        instrument.records.clear()
+        clear_transposition_table()
+        minimax(initial_state(), use_book=False)
+        minimax(initial_state())
+        searched, looked_up = instrument.records
+        assert searched["nodes"] == sum(searched["depths"]) > 1
+        assert searched["cutoffs"] > 0 and not searched["book"]
+        assert looked_up["book"] and looked_up["nodes"] == 0
+        summary = instrument.summary()
+        assert summary["moves"] == 2 and summary["nodes"] == searched["nodes"]
+    finally:
+        instrument.disable()
+        instrument.records.clear()
+    minimax(initial_state())
+    assert not instrument.records